@@ -5,55 +5,88 @@ A command-line tool to analyze, organize, and restructure your Google Drive fold
 """
 
 import click
-from rich.console import Console
-from rich.panel import Panel
 
-from src.auth.google_auth import GoogleDriveAuth
-from src.scanner.drive_scanner import DriveScanner
-from src.cache.drive_cache import CachedDriveScanner
+from src.console import console
+from src.scanner.drive_scanner import AnalysisContext, DriveScanner
+from src.cache.drive_cache import CachedDriveScanner, DriveCache
 from src.analyzer.duplicate_detector import DuplicateDetector
 from src.analyzer.structure_analyzer import StructureAnalyzer
-from src.analyzer.llm_analyzer import LLMAnalyzer
-from src.reorganizer.drive_organizer import DriveOrganizer
 
-console = Console()
+# Google API client, Ollama and the organizer are imported inside the commands that
+# use them, so local commands like cache-status don't pay for loading them
 
-@click.group()
+class DriveSession:
+    """Authentication shared by all commands run in one process"""
+    
+    def __init__(self):
+        self._auth = None
+    
+    @property
+    def auth(self):
+        # GoogleDriveAuth only authenticates once its service is first used
+        if self._auth is None:
+            from src.auth.google_auth import GoogleDriveAuth
+            self._auth = GoogleDriveAuth()
+        return self._auth
+    
+    @property
+    def service(self):
+        return self.auth.get_service()
+    
+    @property
+    def credentials(self):
+        return self.auth.credentials
+
+@click.group(chain=True)
 @click.version_option(version="1.0.0")
-def cli():
-    """Google Drive CLI Manager - Organize your Drive efficiently"""
-    console.print(Panel.fit(
-        "[bold blue]Google Drive CLI Manager[/]\n"
-        "Analyze, organize, and restructure your Google Drive",
-        style="blue"
-    ))
+@click.option('--quiet', '-q', is_flag=True, help='Do not show the banner')
+@click.pass_context
+def cli(ctx, quiet):
+    """Google Drive CLI Manager - Organize your Drive efficiently
+    
+    Commands can be chained to share one authenticated session, e.g.
+    "main.py scan duplicates".
+    """
+    ctx.obj = DriveSession()
+    
+    # The banner is for people at a terminal, not for scripts and pipes
+    if console.is_terminal and not quiet:
+        from rich.panel import Panel
+        console.print(Panel.fit(
+            "[bold blue]Google Drive CLI Manager[/]\n"
+            "Analyze, organize, and restructure your Google Drive",
+            style="blue"
+        ))
 
 @cli.command()
 @click.option('--folder-id', default='root', help='Folder ID to scan (default: root)')
 @click.option('--force-refresh', is_flag=True, help='Force fresh scan, ignore cache')
 @click.option('--no-cache', is_flag=True, help='Disable caching for this scan')
-@click.option('--cache-ttl', default=2, help='Cache time-to-live in hours (default: 2)')
-def scan(folder_id, force_refresh, no_cache, cache_ttl):
+@click.option('--cache-ttl', type=float, help='Cache time-to-live in hours (default: adapts to how often the Drive changes)')
+@click.pass_obj
+def scan(session, folder_id, force_refresh, no_cache, cache_ttl):
     """Scan and analyze your Google Drive structure"""
     try:
         # Initialize components
-        auth = GoogleDriveAuth()
-        scanner = CachedDriveScanner(auth.get_service(), cache_ttl_hours=cache_ttl)
+        scanner = CachedDriveScanner(session, cache_ttl_hours=cache_ttl)
         analyzer = StructureAnalyzer()
         
-        # Test connection
-        if not auth.test_connection():
+        use_cache = not no_cache
+        
+        # Test connection, unless a valid cache answers without touching Drive
+        fresh_scan = force_refresh or not use_cache or not scanner.cache.is_cache_valid(folder_id)
+        if fresh_scan and not session.auth.test_connection():
             console.print("❌ Failed to connect to Google Drive")
             return
         
         # Scan drive with caching
-        use_cache = not no_cache
         items = scanner.scan_drive(folder_id, force_refresh=force_refresh, use_cache=use_cache)
         
-        # Analyze structure
-        issues, suggestions = analyzer.analyze_structure(items)
+        # Analyze structure (items are partitioned once for both passes)
+        context = AnalysisContext.of(items)
+        issues, suggestions = analyzer.analyze_structure(context)
         analyzer.print_analysis_report(issues, suggestions)
-        analyzer.visualize_structure(items)
+        analyzer.visualize_structure(context)
         
     except FileNotFoundError as e:
         console.print(f"❌ {e}")
@@ -65,20 +98,31 @@ def scan(folder_id, force_refresh, no_cache, cache_ttl):
 @click.option('--folder-id', default='root', help='Folder ID to scan (default: root)')
 @click.option('--force-refresh', is_flag=True, help='Force fresh scan, ignore cache')
 @click.option('--no-cache', is_flag=True, help='Disable caching for this scan')
-def duplicates(folder_id, force_refresh, no_cache):
+@click.option('--strict', is_flag=True, help='Skip the low-confidence same-size-only matches')
+@click.pass_obj
+def duplicates(session, folder_id, force_refresh, no_cache, strict):
     """Find and report duplicate files"""
     try:
         # Initialize components
-        auth = GoogleDriveAuth()
-        scanner = CachedDriveScanner(auth.get_service())
-        detector = DuplicateDetector()
+        scanner = CachedDriveScanner(session)
+        detector = DuplicateDetector(session)
         
-        # Scan with caching
+        # A valid cache streams just the files with a shared size out of its size index;
+        # otherwise scan with caching and bucket the scan result
         use_cache = not no_cache
-        items = scanner.scan_drive(folder_id, force_refresh=force_refresh, use_cache=use_cache)
+        by_size = scanner.cache.load_size_buckets(folder_id) if use_cache and not force_refresh else None
+        if by_size is None:
+            items = scanner.scan_drive(folder_id, force_refresh=force_refresh, use_cache=use_cache)
+            by_size = detector.bucket_by_size(items)
+        
+        # Older caches predate checksums - fetch them in batches for size-colliding files only
+        missing = [f for group in by_size.values() for f in group if f.missing_checksum]
+        if missing:
+            console.print(f"🔑 Fetching checksums for {len(missing)} candidate files...")
+            scanner.fetch_checksums(missing)
         
-        # Find duplicates
-        duplicate_groups = detector.find_duplicates(items)
+        # Find duplicates among the same size buckets
+        duplicate_groups = detector.find_duplicates(by_size=by_size, strict=strict)
         detector.print_duplicate_report(duplicate_groups)
         
     except Exception as e:
@@ -92,14 +136,16 @@ def duplicates(folder_id, force_refresh, no_cache):
 @click.option('--execute/--no-execute', default=False, help='Execute the reorganization')
 @click.option('--force-refresh', is_flag=True, help='Force fresh scan, ignore cache')
 @click.option('--no-cache', is_flag=True, help='Disable caching for this scan')
-@click.option('--cache-ttl', default=2, help='Cache time-to-live in hours (default: 2)')
-def organize(folder_id, method, preview, execute, force_refresh, no_cache, cache_ttl):
+@click.option('--cache-ttl', type=float, help='Cache time-to-live in hours (default: adapts to how often the Drive changes)')
+@click.pass_obj
+def organize(session, folder_id, method, preview, execute, force_refresh, no_cache, cache_ttl):
     """Reorganize your Google Drive"""
     try:
+        from src.reorganizer.drive_organizer import DriveOrganizer
+        
         # Initialize components
-        auth = GoogleDriveAuth()
-        scanner = CachedDriveScanner(auth.get_service(), cache_ttl_hours=cache_ttl)
-        organizer = DriveOrganizer(auth.get_service())
+        scanner = CachedDriveScanner(session, cache_ttl_hours=cache_ttl)
+        organizer = DriveOrganizer(session)
 
         # Scan drive with caching
         use_cache = not no_cache
@@ -141,14 +187,16 @@ def organize(folder_id, method, preview, execute, force_refresh, no_cache, cache
 @click.option('--execute/--no-execute', default=False, help='Execute the cleanup')
 @click.option('--force-refresh', is_flag=True, help='Force fresh scan, ignore cache')
 @click.option('--no-cache', is_flag=True, help='Disable caching for this scan')
-@click.option('--cache-ttl', default=2, help='Cache time-to-live in hours (default: 2)')
-def cleanup(folder_id, execute, force_refresh, no_cache, cache_ttl):
+@click.option('--cache-ttl', type=float, help='Cache time-to-live in hours (default: adapts to how often the Drive changes)')
+@click.pass_obj
+def cleanup(session, folder_id, execute, force_refresh, no_cache, cache_ttl):
     """Clean up empty folders and fix naming issues"""
     try:
+        from src.reorganizer.drive_organizer import DriveOrganizer
+        
         # Initialize components
-        auth = GoogleDriveAuth()
-        scanner = CachedDriveScanner(auth.get_service(), cache_ttl_hours=cache_ttl)
-        organizer = DriveOrganizer(auth.get_service())
+        scanner = CachedDriveScanner(session, cache_ttl_hours=cache_ttl)
+        organizer = DriveOrganizer(session)
 
         # Scan drive with caching
         use_cache = not no_cache
@@ -185,6 +233,7 @@ def cleanup(folder_id, execute, force_refresh, no_cache, cache_ttl):
 @cli.command()
 def setup():
     """Setup Google Drive API credentials"""
+    from rich.panel import Panel
     console.print(Panel(
         "[bold]Setup Instructions[/]\n\n"
         "1. Go to [link]https://console.cloud.google.com[/]\n"
@@ -201,25 +250,36 @@ def setup():
 @click.option('--model', default='gpt-oss:20b', help='Ollama model to use (default: gpt-oss:20b)')
 @click.option('--force-refresh', is_flag=True, help='Force fresh scan, ignore cache')
 @click.option('--no-cache', is_flag=True, help='Disable caching for this scan')
-def smart_analyze(folder_id, model, force_refresh, no_cache):
+@click.option('--reanalyze', is_flag=True, help='Ignore cached AI analysis and ask the model again')
+@click.pass_obj
+def smart_analyze(session, folder_id, model, force_refresh, no_cache, reanalyze):
     """AI-powered intelligent folder structure analysis"""
     try:
+        from src.analyzer.llm_analyzer import LLMAnalyzer, ProjectGroup
+        
         # Initialize components
-        auth = GoogleDriveAuth()
-        scanner = CachedDriveScanner(auth.get_service())
-        llm_analyzer = LLMAnalyzer(model=model)
+        scanner = CachedDriveScanner(session)
+        llm_analyzer = LLMAnalyzer(model=model, refresh=reanalyze)
         
         # Scan drive with caching
         use_cache = not no_cache
         items = scanner.scan_drive(folder_id, force_refresh=force_refresh, use_cache=use_cache)
         
-        # Get AI suggestions
-        suggestions = llm_analyzer.analyze_folder_structure(items)
-        llm_analyzer.print_smart_suggestions(suggestions)
+        # Get AI suggestions and project boundaries in one request; suggestions
+        # are printed as they stream in, project groups are collected for below
+        projects = []
+        
+        def stream_suggestions():
+            for result in llm_analyzer.iter_analysis(items):
+                if isinstance(result, ProjectGroup):
+                    projects.append(result)
+                else:
+                    yield result
+        
+        llm_analyzer.print_smart_suggestions(stream_suggestions())
         
         # Detect project boundaries
         console.print("\n🎯 Detecting Project Boundaries...")
-        projects = llm_analyzer.detect_project_boundaries(items)
         
         if projects:
             console.print(f"\n📂 Found {len(projects)} potential project groups:")
@@ -234,21 +294,25 @@ def smart_analyze(folder_id, model, force_refresh, no_cache):
 @click.option('--folder-id', default='root', help='Folder ID to analyze (default: root)')
 @click.option('--model', default='gpt-oss:20b', help='Ollama model to use')
 @click.option('--execute/--no-execute', default=False, help='Execute the LLM suggestions')
-def smart_organize(folder_id, model, execute):
+@click.pass_obj
+def smart_organize(session, folder_id, model, execute):
     """AI-powered folder reorganization"""
     try:
+        from src.analyzer.llm_analyzer import LLMAnalyzer, SmartSuggestion
+        from src.reorganizer.drive_organizer import DriveOrganizer
+        
         # Initialize components
-        auth = GoogleDriveAuth()
-        scanner = DriveScanner(auth.get_service())
+        scanner = DriveScanner(session.service, session.credentials)
         llm_analyzer = LLMAnalyzer(model=model)
-        organizer = DriveOrganizer(auth.get_service())
+        organizer = DriveOrganizer(session)
         
         # Scan drive
         items = scanner.scan_drive(folder_id)
         
-        # Get AI suggestions
-        suggestions = llm_analyzer.analyze_folder_structure(items)
-        llm_analyzer.print_smart_suggestions(suggestions)
+        # Get AI suggestions, printed as they stream in
+        llm_analyzer.print_smart_suggestions(
+            result for result in llm_analyzer.iter_analysis(items) if isinstance(result, SmartSuggestion)
+        )
         
         if execute:
             console.print("\n⚠️  LLM-based execution not yet implemented")
@@ -261,18 +325,25 @@ def smart_organize(folder_id, model, execute):
 @click.argument('folder_name')
 @click.option('--folder-id', help='Specific folder ID to rename')
 @click.option('--model', default='gpt-oss:20b', help='Ollama model to use')
-def smart_rename(folder_name, folder_id, model):
+@click.option('--similarity-threshold', default=0.92, help='Reuse a cached suggestion for folders at least this similar (default: 0.92)')
+@click.pass_obj
+def smart_rename(session, folder_name, folder_id, model, similarity_threshold):
     """Get AI suggestions for better folder names"""
     try:
+        from src.analyzer.llm_analyzer import LLMAnalyzer
+        
         # Initialize components
-        auth = GoogleDriveAuth()
-        scanner = DriveScanner(auth.get_service())
-        llm_analyzer = LLMAnalyzer(model=model)
+        llm_analyzer = LLMAnalyzer(model=model, similarity_threshold=similarity_threshold)
         
         if folder_id:
-            # Analyze specific folder
-            items = scanner.scan_drive('root')  # Need full scan to get context
-            folder_items = [item for item in items.values() if item.parents and folder_id in item.parents]
+            # Only the folder's own contents are needed: read them from a valid cache
+            # through its parent index, otherwise list just that folder
+            cached_items = DriveCache().cached_items()
+            if cached_items is not None and folder_id in cached_items:
+                folder_items = cached_items.children(folder_id)
+            else:
+                scanner = DriveScanner(session.service, session.credentials)
+                folder_items = scanner.list_folders([folder_id])[folder_id] or []
             
             if folder_items:
                 suggestion = llm_analyzer.suggest_folder_name(folder_items, folder_name)
@@ -289,7 +360,6 @@ def smart_rename(folder_name, folder_id, model):
 def cache_status():
     """Show cache status and information"""
     try:
-        from src.cache.drive_cache import DriveCache
         cache = DriveCache()
         cache.print_cache_status()
     except Exception as e:
@@ -300,41 +370,41 @@ def cache_status():
 def cache_clear():
     """Clear all cached data"""
     try:
-        from src.cache.drive_cache import DriveCache
+        from src.cache.llm_cache import LLMResponseCache
         cache = DriveCache()
         cache.clear_cache()
+        LLMResponseCache().clear()
     except Exception as e:
         console.print(f"❌ Error: {e}")
 
 @cli.command()
-@click.option('--ttl', default=2, help='Cache time-to-live in hours (default: 2)')
+@click.option('--ttl', type=float, help='Cache time-to-live in hours (default: adapts to how often the Drive changes)')
 @click.option('--folder-id', default='root', help='Folder ID to cache (default: root)')
-def cache_refresh(ttl, folder_id):
+@click.option('--full', is_flag=True, help='Rescan everything instead of applying Drive changes')
+@click.pass_obj
+def cache_refresh(session, ttl, folder_id, full):
     """Force refresh cache with new data"""
     try:
-        auth = GoogleDriveAuth()
-        scanner = CachedDriveScanner(auth.get_service(), cache_ttl_hours=ttl)
+        scanner = CachedDriveScanner(session, cache_ttl_hours=ttl)
         
-        # Force refresh and cache
-        console.print(f"🔄 Refreshing cache (TTL: {ttl}h)...")
-        items = scanner.scan_drive(folder_id, force_refresh=True, use_cache=True)
+        # Apply changes since the last scan (or rescan) and cache
+        console.print(f"🔄 Refreshing cache (TTL: {f'{ttl:g}h' if ttl else 'adaptive'})...")
+        items = scanner.refresh(folder_id, full=full)
         console.print(f"✅ Cache refreshed with {len(items)} items")
         
     except Exception as e:
         console.print(f"❌ Error: {e}")
 
 @cli.command()
-def test():
+@click.pass_obj
+def test(session):
     """Test Google Drive connection"""
     try:
-        auth = GoogleDriveAuth()
-        if auth.test_connection():
+        about = session.auth.test_connection()
+        if about:
             console.print("✅ Google Drive connection successful!")
             
-            # Get basic info
-            service = auth.get_service()
-            about = service.about().get(fields="user,storageQuota").execute()
-            
+            # Basic info comes with the connection test
             user = about.get('user', {})
             storage = about.get('storageQuota', {})
             
@@ -8,7 +8,7 @@ echo.
 REM Check if Python is installed
 python --version >nul 2>&1
 if %errorlevel% neq 0 (
-    echo ❌ Python is not installed or not in PATH. Please install Python 3.7+ and try again.
+    echo ❌ Python is not installed or not in PATH. Please install Python 3.10+ and try again.
     pause
     exit /b 1
 )
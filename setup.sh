@@ -8,7 +8,7 @@ echo
 
 # Check if Python is installed
 if ! command -v python3 &> /dev/null; then
-    echo "❌ Python 3 is not installed. Please install Python 3.7+ and try again."
+    echo "❌ Python 3 is not installed. Please install Python 3.10+ and try again."
     exit 1
 fi
 
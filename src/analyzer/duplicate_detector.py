@@ -1,59 +1,157 @@
+import functools
 import hashlib
-from typing import Dict, List, Set, Tuple
-from dataclasses import dataclass
+import multiprocessing
+import re
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Tuple, Union
+from dataclasses import dataclass, field
 from collections import defaultdict
-from rich.console import Console
+from itertools import groupby
+from operator import attrgetter, itemgetter
 from rich.table import Table
 
+from ..console import console
 from ..scanner.drive_scanner import DriveItem
 
-@dataclass
+# BLAKE3 (SIMD-accelerated) for hashing downloaded content; BLAKE2b if the wheel is unavailable
+try:
+    from blake3 import blake3 as _content_hasher
+except ImportError:
+    _content_hasher = hashlib.blake2b
+
+# Common duplicate indicators: " (1)" to " (5)", " - copy", " copy", "_copy", " duplicate".
+# Copy counters need a space before them, so "Report (2019)" or "Budget(12)" keep their numbers.
+_DUPLICATE_MARKER_RE = re.compile(r'\s+\([1-5]\)|\s+-\s+copy\b|\s+copy\b|_copy\b|\s+duplicate\b')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+@functools.lru_cache(maxsize=65536)
+def _normalize_filename(filename: str) -> str:
+    # Remove common duplicate indicators and collapse extra spaces.
+    # Cached because the same name (IMG_0001.jpg, ...) recurs across backup folders.
+    filename = _DUPLICATE_MARKER_RE.sub('', filename.lower())
+    return _WHITESPACE_RE.sub(' ', filename).strip()
+
+_SIZE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB', 'PB')
+
+# Leading bytes fetched to rule out files without a Drive checksum before a full download
+PARTIAL_HASH_BYTES = 4096
+
+# Above this many candidates the grouping passes run in worker processes;
+# below it, process start-up and pickling cost more than the passes themselves
+PARALLEL_MIN_CANDIDATES = 50_000
+
+# Grouping passes over slim (md5, name_lower, normalized_name, size, settled) rows:
+# method -> (confidence, key function). A key of None leaves the row out of the pass.
+# Settled rows (a Drive checksum or hashed content) are left to the content hash passes, so
+# the name-based passes never group files whose content is known to differ.
+_GROUPING_PASSES = {
+    # Identical content (Drive md5Checksum) - only binary files carry one
+    "Content Hash": (1.0, lambda row: (row[0], row[3]) if row[0] else None),
+    # Exact name and size match
+    "Name + Size": (0.9, lambda row: None if row[4] else (row[1], row[3])),
+    # Same name after removing copy markers, different case
+    "Similar Names": (0.7, lambda row: None if row[4] else row[2]),
+    # Same size, similar names
+    "Size + Similar Name": (0.6, lambda row: None if row[4] else (row[2], row[3])),
+}
+
+_worker_rows = []
+
+def _init_grouping_worker(rows):
+    global _worker_rows
+    _worker_rows = rows
+
+def _group_rows(method: str, rows=None) -> List[List[int]]:
+    """Run one grouping pass, returning groups of row indices"""
+    key_func = _GROUPING_PASSES[method][1]
+    keyed = []
+    for idx, row in enumerate(_worker_rows if rows is None else rows):
+        key = key_func(row)
+        if key is not None:
+            keyed.append((key, idx))
+    
+    # Sorting brings equal keys together, so groups are consecutive runs (no dict of lists)
+    keyed.sort()
+    groups = []
+    for _, run in groupby(keyed, key=itemgetter(0)):
+        indices = [idx for _, idx in run]
+        if len(indices) > 1:
+            groups.append(indices)
+    return groups
+
+@dataclass(frozen=True)
 class DuplicateGroup:
     files: List[DriveItem]
     detection_method: str
     confidence: float
+    total_size: int = field(init=False)
+    wasted_space: int = field(init=False)
     
-    @property
-    def total_size(self) -> int:
-        return sum(f.size or 0 for f in self.files)
+    def __post_init__(self):
+        # Computed once at construction rather than re-summed on every access
+        total_size = sum(f.size or 0 for f in self.files)
+        object.__setattr__(self, 'total_size', total_size)
+        object.__setattr__(self, 'wasted_space', total_size - (self.files[0].size or 0))
+
+class _HashWriter:
+    """File-like sink for MediaIoBaseDownload that hashes chunks instead of keeping them"""
+    def __init__(self, hasher):
+        self.hasher = hasher
     
-    @property
-    def wasted_space(self) -> int:
-        return self.total_size - (self.files[0].size or 0)
+    def write(self, data: bytes):
+        self.hasher.update(data)
 
 class DuplicateDetector:
-    def __init__(self):
-        self.console = Console()
+    def __init__(self, session=None):
+        self.console = console
+        # Optional session (anything with a service attribute) - enables content hashing of files
+        # without md5Checksum; the service is only read when such files need hashing
+        self.session = session
     
-    def find_duplicates(self, items: Dict[str, DriveItem]) -> List[DuplicateGroup]:
-        files = [item for item in items.values() if not item.is_folder and item.size]
-        duplicates = []
-        
+    @property
+    def service(self):
+        return self.session.service if self.session is not None else None
+    
+    def find_duplicates(self, items: Union[Dict[str, DriveItem], Iterable[DriveItem], None] = None, strict: bool = False,
+                        by_size: Optional[Dict[int, List[DriveItem]]] = None) -> List[DuplicateGroup]:
+        """Group likely duplicates from a scan result, or from size buckets already built by bucket_by_size"""
         self.console.print("🔍 Detecting duplicates...")
         
-        # Method 1: Exact name and size match
-        name_size_groups = self._group_by_name_and_size(files)
-        for group in name_size_groups:
-            if len(group) > 1:
-                duplicates.append(DuplicateGroup(group, "Name + Size", 0.9))
+        # Bucket by size once - equal size is a necessary condition for a duplicate,
+        # so files with a unique size never need to enter the name-based passes
+        if by_size is None:
+            by_size = self.bucket_by_size(items)
+        candidates = [file for group in by_size.values() for file in group]
         
-        # Method 2: Same name, different case
-        name_groups = self._group_by_similar_names(files)
-        for group in name_groups:
-            if len(group) > 1:
-                duplicates.append(DuplicateGroup(group, "Similar Names", 0.7))
+        duplicates = []
         
-        # Method 3: Same size, similar names
-        size_groups = self._group_by_size_and_similar_names(files)
-        for group in size_groups:
-            if len(group) > 1:
-                duplicates.append(DuplicateGroup(group, "Size + Similar Name", 0.6))
+        # Files without a Drive checksum (when a service is available): hash the first
+        # few KiB, then fully hash only those whose leading bytes still collide
+        content_checked = set()
+        if self.session is not None:
+            unhashed = [f for f in candidates if f.missing_checksum]
+            for group in self._group_by_partial_hash(unhashed, content_checked):
+                duplicates.append(DuplicateGroup(group, "Content Hash", 1.0))
         
-        # Method 4: Exact size match (potential duplicates)
-        size_only_groups = self._group_by_size_only(files)
-        for group in size_only_groups:
-            if len(group) > 1:
-                duplicates.append(DuplicateGroup(group, "Same Size", 0.4))
+        # Methods 1-4: independent passes over slim rows parallel to `candidates`,
+        # each name normalized exactly once; passes return indices into `candidates`
+        rows = [(f.md5_checksum, f.name.lower(), _normalize_filename(f.name), f.size,
+                 bool(f.md5_checksum) or f.id in content_checked)
+                for f in candidates]
+        for method, index_groups in zip(_GROUPING_PASSES, self._run_grouping_passes(rows)):
+            confidence = _GROUPING_PASSES[method][0]
+            for indices in index_groups:
+                duplicates.append(DuplicateGroup([candidates[i] for i in indices], method, confidence))
+        
+        # Method 5: Exact size match (potential duplicates), reusing the size buckets.
+        # Files with a checksum or hashed content are settled by the content hash passes:
+        # either they are already in a "Content Hash" group or their content is unique. Strict mode
+        # skips this low-confidence pass altogether.
+        if not strict:
+            for size, group in by_size.items():
+                if size > 1024 * 1024:  # Only files > 1MB
+                    unhashed = [f for f in group if not f.md5_checksum and f.id not in content_checked]
+                    if len(unhashed) > 1:
+                        duplicates.append(DuplicateGroup(unhashed, "Same Size", 0.4))
         
         # Remove duplicates from results (files can appear in multiple groups)
         duplicates = self._deduplicate_groups(duplicates)
@@ -61,61 +159,102 @@ class DuplicateDetector:
         self.console.print(f"✅ Found {len(duplicates)} duplicate groups")
         return duplicates
     
-    def _group_by_name_and_size(self, files: List[DriveItem]) -> List[List[DriveItem]]:
-        groups = defaultdict(list)
-        for file in files:
-            key = (file.name.lower(), file.size)
-            groups[key].append(file)
-        return [group for group in groups.values() if len(group) > 1]
+    def bucket_by_size(self, items: Union[Dict[str, DriveItem], Iterable[DriveItem]]) -> Dict[int, List[DriveItem]]:
+        """Files grouped by size, keeping only sizes shared by at least two files"""
+        # Folders and empty files can't be duplicates, so only sized files are collected and sorted
+        files = [item for item in (items.values() if isinstance(items, Mapping) else items)
+                 if not item.is_folder and item.size]
+        files.sort(key=attrgetter('size'))
+        
+        by_size = {}
+        for size, run in groupby(files, key=attrgetter('size')):
+            group = list(run)
+            if len(group) > 1:
+                by_size[size] = group
+        return by_size
     
-    def _group_by_similar_names(self, files: List[DriveItem]) -> List[List[DriveItem]]:
-        groups = defaultdict(list)
+    def _group_by_partial_hash(self, files: List[DriveItem], content_checked: Set[str]) -> List[List[DriveItem]]:
+        """Group files by content hash; IDs whose content was compared go into content_checked"""
+        by_size = defaultdict(list)
         for file in files:
-            # Remove common suffixes and normalize
-            name = self._normalize_filename(file.name)
-            groups[name].append(file)
-        return [group for group in groups.values() if len(group) > 1]
+            by_size[file.size].append(file)
+        by_size = {size: group for size, group in by_size.items() if len(group) > 1}
+        if not by_size:
+            return []
+        
+        self.console.print(f"🔬 Hashing {sum(len(g) for g in by_size.values())} files without checksums...")
+        
+        partial_groups = defaultdict(list)
+        for size, group in by_size.items():
+            for file in group:
+                head = self._read_head(file.id)
+                if head is not None:
+                    partial_groups[(size, _content_hasher(head).hexdigest())].append(file)
+                    content_checked.add(file.id)
+        
+        groups = []
+        for (size, _), group in partial_groups.items():
+            if len(group) < 2:
+                continue
+            if size <= PARTIAL_HASH_BYTES:
+                # The leading bytes were the whole file
+                groups.append(group)
+                continue
+            
+            full_groups = defaultdict(list)
+            for file in group:
+                digest = self._hash_content(file.id)
+                if digest is not None:
+                    full_groups[digest].append(file)
+            groups.extend(g for g in full_groups.values() if len(g) > 1)
+        
+        return groups
     
-    def _group_by_size_and_similar_names(self, files: List[DriveItem]) -> List[List[DriveItem]]:
-        groups = defaultdict(list)
-        for file in files:
-            name = self._normalize_filename(file.name)
-            key = (name, file.size)
-            groups[key].append(file)
-        return [group for group in groups.values() if len(group) > 1]
+    def _read_head(self, file_id: str) -> Optional[bytes]:
+        try:
+            request = self.service.files().get_media(fileId=file_id)
+            request.headers['Range'] = f'bytes=0-{PARTIAL_HASH_BYTES - 1}'
+            return request.execute()
+        except Exception as e:
+            self.console.print(f"⚠️  Could not read {file_id}: {e}")
+            return None
     
-    def _group_by_size_only(self, files: List[DriveItem]) -> List[List[DriveItem]]:
-        groups = defaultdict(list)
-        for file in files:
-            if file.size and file.size > 1024 * 1024:  # Only files > 1MB
-                groups[file.size].append(file)
-        return [group for group in groups.values() if len(group) > 1]
+    def _hash_content(self, file_id: str) -> Optional[str]:
+        from googleapiclient.http import MediaIoBaseDownload
+        
+        hasher = _content_hasher()
+        try:
+            downloader = MediaIoBaseDownload(_HashWriter(hasher), self.service.files().get_media(fileId=file_id))
+            done = False
+            while not done:
+                _, done = downloader.next_chunk()
+            return hasher.hexdigest()
+        except Exception as e:
+            self.console.print(f"⚠️  Could not download {file_id}: {e}")
+            return None
     
-    def _normalize_filename(self, filename: str) -> str:
-        # Remove common duplicate indicators
-        filename = filename.lower()
-        suffixes_to_remove = [' (1)', ' (2)', ' (3)', ' (4)', ' (5)', 
-                             ' copy', ' - copy', '_copy', ' duplicate']
-        
-        for suffix in suffixes_to_remove:
-            filename = filename.replace(suffix, '')
-        
-        # Remove extra spaces
-        filename = ' '.join(filename.split())
-        return filename
+    def _run_grouping_passes(self, rows: List[tuple]) -> List[List[List[int]]]:
+        methods = list(_GROUPING_PASSES)
+        if len(rows) < PARALLEL_MIN_CANDIDATES:
+            return [_group_rows(method, rows) for method in methods]
+        
+        # Rows reach the workers through the initializer (inherited, not pickled, on fork)
+        with multiprocessing.Pool(len(methods), initializer=_init_grouping_worker, initargs=(rows,)) as pool:
+            return pool.map(_group_rows, methods)
     
     def _deduplicate_groups(self, groups: List[DuplicateGroup]) -> List[DuplicateGroup]:
-        seen_files = set()
+        claimed = set()
         unique_groups = []
         
         # Sort by confidence (highest first)
-        groups.sort(key=lambda g: g.confidence, reverse=True)
+        groups.sort(key=attrgetter('confidence'), reverse=True)
         
+        # First group to reach a file claims it; stop checking at the first claimed file
         for group in groups:
-            file_ids = {f.id for f in group.files}
-            if not file_ids.intersection(seen_files):
-                unique_groups.append(group)
-                seen_files.update(file_ids)
+            if any(f.id in claimed for f in group.files):
+                continue
+            unique_groups.append(group)
+            claimed.update(f.id for f in group.files)
         
         return unique_groups
     
@@ -163,15 +302,10 @@ class DuplicateDetector:
         self.console.print(table)
     
     def _format_size(self, size_bytes: int) -> str:
-        if size_bytes == 0:
+        if size_bytes <= 0:
             return "0 B"
         
-        units = ['B', 'KB', 'MB', 'GB', 'TB']
-        size = float(size_bytes)
-        unit_idx = 0
-        
-        while size >= 1024 and unit_idx < len(units) - 1:
-            size /= 1024
-            unit_idx += 1
+        # Each unit is 2**10 of the previous one, so the bit length picks it directly
+        unit_idx = min((size_bytes.bit_length() - 1) // 10, len(_SIZE_UNITS) - 1)
         
-        return f"{size:.1f} {units[unit_idx]}"
\ No newline at end of file
+        return f"{size_bytes / (1 << (10 * unit_idx)):.1f} {_SIZE_UNITS[unit_idx]}"
\ No newline at end of file
@@ -1,12 +1,21 @@
+import asyncio
+import hashlib
 import json
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
 from dataclasses import dataclass
 import ollama
-from rich.console import Console
 from rich.panel import Panel
 from rich.table import Table
 
-from ..scanner.drive_scanner import DriveItem
+from ..console import console
+from ..cache.llm_cache import LLMResponseCache, SemanticCache
+from ..scanner.drive_scanner import AnalysisContext, DriveItem
+
+# orjson parses LLM replies several times faster; stdlib json if the wheel is unavailable
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
 
 @dataclass
 class SmartSuggestion:
@@ -23,11 +32,108 @@ class ProjectGroup:
     files: List[str]
     rationale: str
 
+class _JsonArrayItems:
+    """Incremental parser yielding (array key, element) as each object in a top-level array closes.
+    
+    Only the first JSON object is read; braces inside strings and any prose before or after it are ignored.
+    """
+    
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.started = False
+        self.finished = False
+        self.stack = []
+        self.in_string = False
+        self.escaped = False
+        self.string_start = 0
+        self.last_key = None
+        self.array_key = None
+        self.item_start = None
+    
+    def feed(self, text: str) -> Iterator[Tuple[str, Dict]]:
+        if self.finished:
+            return
+        
+        self.buffer += text
+        buffer = self.buffer
+        
+        while self.pos < len(buffer):
+            char = buffer[self.pos]
+            
+            if not self.started:
+                # Skip any chatter before the JSON object
+                if char == '{':
+                    self.started = True
+                    self.stack.append('{')
+            elif self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+                    if len(self.stack) == 1:
+                        self.last_key = _json_loads(buffer[self.string_start:self.pos + 1])
+            elif char == '"':
+                self.in_string = True
+                self.string_start = self.pos
+            elif char in '{[':
+                if len(self.stack) == 1 and char == '[':
+                    self.array_key = self.last_key
+                elif len(self.stack) == 2 and self.stack[-1] == '[' and char == '{':
+                    self.item_start = self.pos
+                self.stack.append(char)
+            elif char in '}]' and self.stack:
+                self.stack.pop()
+                if len(self.stack) == 2 and self.item_start is not None:
+                    try:
+                        yield self.array_key, _json_loads(buffer[self.item_start:self.pos + 1])
+                    except ValueError:
+                        pass
+                    self.item_start = None
+                elif not self.stack:
+                    # The object is complete; trailing text is not parsed
+                    self.finished = True
+                    self.buffer = ""
+                    return
+            
+            self.pos += 1
+        
+        # Only an unfinished element (or key) needs to be kept
+        keep_from = self.item_start if self.item_start is not None else (self.string_start if self.in_string else self.pos)
+        self.buffer = buffer[keep_from:]
+        self.pos -= keep_from
+        self.string_start -= keep_from
+        if self.item_start is not None:
+            self.item_start = 0
+
+def _has_json_items(text: str) -> bool:
+    """Whether a reply holds a complete JSON object with at least one array element"""
+    parser = _JsonArrayItems()
+    count = sum(1 for _ in parser.feed(text))
+    return parser.finished and count > 0
+
 class LLMAnalyzer:
-    def __init__(self, model: str = "gpt-oss:20b"):
-        self.console = Console()
+    def __init__(self, model: str = "gpt-oss:20b", use_cache: bool = True, cache_ttl_hours: float = 24 * 7,
+                 similarity_threshold: float = 0.92, lazy: bool = True, refresh: bool = False):
+        self.console = console
         self.model = model
-        self._check_ollama_connection()
+        self.refresh = refresh
+        # Identical prompts (same structure summary, same folder contents) skip the LLM entirely
+        self._cache = LLMResponseCache(ttl_hours=cache_ttl_hours) if use_cache else None
+        # Folders with near-identical contents ("5 PDFs, 2 DOCX") reuse an earlier name suggestion
+        self._semantic_cache = (SemanticCache(threshold=similarity_threshold, ttl_hours=cache_ttl_hours)
+                                if use_cache else None)
+        # By default Ollama is only checked right before the first request that isn't cached
+        self._connection_checked = False
+        if not lazy:
+            self._ensure_connection()
+    
+    def _ensure_connection(self):
+        if not self._connection_checked:
+            self._connection_checked = True
+            self._check_ollama_connection()
     
     def _check_ollama_connection(self):
         """Check if Ollama is running and the model is available"""
@@ -41,41 +147,109 @@ class LLMAnalyzer:
                 self.console.print(f"💡 Run: ollama pull {self.model}")
                 return False
             
-            # Test a simple query
-            response = ollama.chat(model=self.model, messages=[
-                {'role': 'user', 'content': 'Hello! Just testing connection. Reply with "OK".'}
-            ])
+            # Metadata only - confirms the model resolves without loading it into memory
+            ollama.show(self.model)
             
-            if 'OK' in response['message']['content']:
-                self.console.print(f"✅ Ollama connected successfully with model: {self.model}")
-                return True
+            self.console.print(f"✅ Ollama connected successfully with model: {self.model}")
+            return True
             
         except Exception as e:
             self.console.print(f"❌ Ollama connection failed: {e}")
             self.console.print("💡 Make sure Ollama is running: ollama serve")
             return False
     
-    def analyze_folder_structure(self, items: Dict[str, DriveItem]) -> List[SmartSuggestion]:
-        """Analyze folder structure and provide intelligent suggestions"""
+    def analyze_all(self, items: Union[Dict[str, DriveItem], AnalysisContext]) -> Tuple[List[SmartSuggestion], List[ProjectGroup]]:
+        """Reorganization suggestions and project groups from a single LLM request"""
+        suggestions, projects = [], []
+        for result in self.iter_analysis(items):
+            (suggestions if isinstance(result, SmartSuggestion) else projects).append(result)
+        return suggestions, projects
+    
+    def iter_analysis(self, items: Union[Dict[str, DriveItem], AnalysisContext]) -> Iterator[Union[SmartSuggestion, ProjectGroup]]:
+        """Yield each suggestion and project group as soon as the streamed reply completes it"""
         self.console.print("🧠 Analyzing folder structure with LLM...")
         
-        # Prepare structure summary for LLM
-        structure_summary = self._prepare_structure_summary(items)
+        # Prepare structure summary for LLM - sent once for both tasks. Large Drives are
+        # split into shards analyzed concurrently (map) and merged by one final request (reduce).
+        summaries = self._prepare_structure_summaries(items)
+        
+        # An unchanged structure reuses the finished analysis - no shard, reduce or parse work at all
+        fingerprint = hashlib.blake2b("\n".join(summaries).encode(), digest_size=16).hexdigest()
+        analysis_key = f"analysis\0{fingerprint}"
+        if (cached := self._cached(analysis_key)) is not None:
+            for key, values in _json_loads(cached).items():
+                for item in values:
+                    yield self._to_result(key, item)
+            return
         
-        prompt = f"""
+        try:
+            if len(summaries) == 1:
+                prompt = self._analysis_prompt(summaries[0])
+            else:
+                self.console.print(f"🧩 Analyzing {len(summaries)} parts of the structure...")
+                prompt = self._reduce_prompt(asyncio.run(self._amap_shards(summaries)))
+            
+            # Parse the JSON response element by element (might have extra text around it)
+            parser = _JsonArrayItems()
+            results = {'suggestions': [], 'projects': []}
+            seen_titles = set()
+            for chunk in self._chat_stream(prompt):
+                for key, item in parser.feed(chunk):
+                    if key == 'suggestions':
+                        if item['title'] in seen_titles:
+                            continue
+                        seen_titles.add(item['title'])
+                    if key in results:
+                        result = self._to_result(key, item)
+                        results[key].append(item)
+                        yield result
+            
+            # A reply without complete JSON or without any element is not worth replaying for a week
+            if self._cache and parser.finished and any(results.values()):
+                self._cache.set(self.model, analysis_key, json.dumps(results))
+            
+        except Exception as e:
+            self.console.print(f"❌ Error analyzing with LLM: {e}")
+    
+    def _to_result(self, key: str, item: Dict) -> Union[SmartSuggestion, ProjectGroup]:
+        if key == 'suggestions':
+            return SmartSuggestion(
+                title=item['title'],
+                description=item['description'],
+                confidence=item['confidence'],
+                actions=item['actions'],
+                reasoning=item['reasoning']
+            )
+        return ProjectGroup(
+            name=item['name'],
+            folders=item.get('folders', []),
+            files=item.get('files', []),
+            rationale=item['rationale']
+        )
+    
+    def _analysis_prompt(self, structure_summary: str) -> str:
+        return f"""
 You are an expert at organizing digital file systems. Analyze this Google Drive structure and provide intelligent reorganization suggestions.
 
 CURRENT STRUCTURE:
 {structure_summary}
 
-Please provide 3-5 actionable suggestions to improve this organization. Focus on:
+TASK 1 - Please provide 3-5 actionable suggestions to improve this organization. Focus on:
 1. Eliminating duplicate folders
 2. Reducing excessive nesting (>5 levels)
 3. Grouping related content logically
 4. Using consistent naming conventions
 5. Creating better project boundaries
 
-Format your response as JSON with this structure:
+TASK 2 - Identify logical project groups that should be organized together. Look for:
+- Related folders that should be grouped together
+- Academic/research projects
+- Work projects
+- Personal projects
+- Travel/event folders
+- Software/technical projects
+
+Format your response as a single JSON object with this structure:
 {{
   "suggestions": [
     {{
@@ -85,42 +259,65 @@ Format your response as JSON with this structure:
       "actions": ["Action 1", "Action 2"],
       "reasoning": "Why this helps"
     }}
+  ],
+  "projects": [
+    {{
+      "name": "Project name",
+      "folders": ["folder1", "folder2"],
+      "files": ["file1.pdf"],
+      "rationale": "Why these belong together"
+    }}
   ]
 }}
 """
+    
+    def _reduce_prompt(self, partials: List[str]) -> str:
+        partial_results = "\n".join(f"PART {i}: {partial}" for i, partial in enumerate(partials, 1))
         
-        try:
-            response = ollama.chat(model=self.model, messages=[
-                {'role': 'user', 'content': prompt}
-            ])
-            
-            # Parse JSON response
-            content = response['message']['content']
-            
-            # Extract JSON from response (might have extra text)
-            json_start = content.find('{')
-            json_end = content.rfind('}') + 1
-            if json_start != -1 and json_end != -1:
-                json_content = content[json_start:json_end]
-                data = json.loads(json_content)
-                
-                suggestions = []
-                for item in data.get('suggestions', []):
-                    suggestions.append(SmartSuggestion(
-                        title=item['title'],
-                        description=item['description'],
-                        confidence=item['confidence'],
-                        actions=item['actions'],
-                        reasoning=item['reasoning']
-                    ))
-                
-                return suggestions
+        return f"""
+You are an expert at organizing digital file systems. A large Google Drive was analyzed in parts.
+These are the suggestions and project groups found for each part:
+
+{partial_results}
+
+Merge them into one analysis of the whole Drive:
+- Keep the 3-5 most valuable suggestions, combining ones that say the same thing
+- Merge project groups that describe the same project
+- Do not repeat a suggestion title
+
+Format your response as a single JSON object with the same structure as the parts:
+{{"suggestions": [...], "projects": [...]}}
+"""
+    
+    async def _amap_shards(self, summaries: List[str], max_concurrent: int = 4) -> List[str]:
+        """Analyze each shard of the structure concurrently, returning each partial result as JSON"""
+        # The client is created inside the running loop because its connection pool is bound to it
+        client = ollama.AsyncClient()
+        semaphore = asyncio.Semaphore(max_concurrent)
+        
+        async def analyze_shard(summary: str) -> str:
+            async with semaphore:
+                content = await self._achat(client, self._analysis_prompt(summary))
             
-        except Exception as e:
-            self.console.print(f"❌ Error analyzing with LLM: {e}")
-            return []
+            partial = {'suggestions': [], 'projects': []}
+            for key, item in _JsonArrayItems().feed(content):
+                if key in partial:
+                    partial[key].append(item)
+            return json.dumps(partial)
+        
+        results = await asyncio.gather(*(analyze_shard(summary) for summary in summaries), return_exceptions=True)
         
-        return []
+        partials = []
+        for i, result in enumerate(results, 1):
+            if isinstance(result, Exception):
+                self.console.print(f"⚠️  Could not analyze part {i}: {result}")
+            else:
+                partials.append(result)
+        return partials
+    
+    def analyze_folder_structure(self, items: Union[Dict[str, DriveItem], AnalysisContext]) -> List[SmartSuggestion]:
+        """Analyze folder structure and provide intelligent suggestions (prefer analyze_all)"""
+        return self.analyze_all(items)[0]
     
     def suggest_folder_name(self, folder_contents: List[DriveItem], current_name: str) -> str:
         """Suggest a better name for a folder based on its contents"""
@@ -128,7 +325,50 @@ Format your response as JSON with this structure:
         # Prepare content summary
         content_summary = self._prepare_content_summary(folder_contents)
         
-        prompt = f"""
+        if (cached := self._lookup_folder_name(content_summary, current_name)) is not None:
+            return cached
+        
+        try:
+            content = self._chat(self._folder_name_prompt(content_summary, current_name))
+            return self._store_folder_name(content_summary, current_name, content)
+            
+        except Exception as e:
+            self.console.print(f"❌ Error getting folder name suggestion: {e}")
+            return current_name
+    
+    def suggest_folder_names_batch(self, folders: List[Tuple[List[DriveItem], str]], max_concurrent: int = 4) -> List[str]:
+        """Suggest names for many (contents, current name) folders with concurrent requests"""
+        return asyncio.run(self._asuggest_folder_names(folders, max_concurrent))
+    
+    async def _asuggest_folder_names(self, folders: List[Tuple[List[DriveItem], str]], max_concurrent: int) -> List[str]:
+        summaries = [(self._prepare_content_summary(contents), name) for contents, name in folders]
+        
+        # Semantic cache hits are resolved up front; its embedding calls would block the loop
+        names = [self._lookup_folder_name(summary, name) for summary, name in summaries]
+        pending = [i for i, name in enumerate(names) if name is None]
+        
+        # The client is created inside the running loop because its connection pool is bound to it.
+        # Ollama only serves requests in parallel up to OLLAMA_NUM_PARALLEL; the rest queue server-side.
+        client = ollama.AsyncClient()
+        semaphore = asyncio.Semaphore(max_concurrent)
+        
+        async def suggest_one(content_summary: str, current_name: str) -> str:
+            async with semaphore:
+                return await self._achat(client, self._folder_name_prompt(content_summary, current_name))
+        
+        results = await asyncio.gather(*(suggest_one(*summaries[i]) for i in pending), return_exceptions=True)
+        
+        for i, result in zip(pending, results):
+            content_summary, current_name = summaries[i]
+            if isinstance(result, Exception):
+                self.console.print(f"❌ Error getting folder name suggestion for {current_name}: {result}")
+                names[i] = current_name
+            else:
+                names[i] = self._store_folder_name(content_summary, current_name, result)
+        return names
+    
+    def _folder_name_prompt(self, content_summary: str, current_name: str) -> str:
+        return f"""
 Suggest a better name for a folder currently called "{current_name}".
 
 FOLDER CONTENTS:
@@ -142,114 +382,115 @@ The new name should be:
 
 Reply with just the suggested folder name, nothing else.
 """
-        
-        try:
-            response = ollama.chat(model=self.model, messages=[
-                {'role': 'user', 'content': prompt}
-            ])
-            
-            suggested_name = response['message']['content'].strip()
-            # Clean up the suggestion
-            suggested_name = suggested_name.replace('"', '').replace("'", "")
-            return suggested_name if suggested_name else current_name
-            
-        except Exception as e:
-            self.console.print(f"❌ Error getting folder name suggestion: {e}")
-            return current_name
     
-    def detect_project_boundaries(self, items: Dict[str, DriveItem]) -> List[ProjectGroup]:
-        """Detect logical project groupings in the folder structure"""
-        
-        structure_summary = self._prepare_structure_summary(items)
+    def _lookup_folder_name(self, content_summary: str, current_name: str) -> Optional[str]:
+        if not self._semantic_cache or self.refresh:
+            return None
+        return self._semantic_cache.lookup(self.model, f"{current_name}\n{content_summary}")
+    
+    def _store_folder_name(self, content_summary: str, current_name: str, content: str) -> str:
+        # Clean up the suggestion
+        suggested_name = content.strip().replace('"', '').replace("'", "")
+        if not suggested_name:
+            return current_name
         
-        prompt = f"""
-Analyze this Google Drive structure and identify logical project groups that should be organized together.
-
-STRUCTURE:
-{structure_summary}
-
-Look for:
-- Related folders that should be grouped together
-- Academic/research projects
-- Work projects
-- Personal projects
-- Travel/event folders
-- Software/technical projects
-
-Format your response as JSON:
-{{
-  "projects": [
-    {{
-      "name": "Project name",
-      "folders": ["folder1", "folder2"],
-      "files": ["file1.pdf"],
-      "rationale": "Why these belong together"
-    }}
-  ]
-}}
-"""
+        if self._semantic_cache:
+            self._semantic_cache.add(self.model, f"{current_name}\n{content_summary}", suggested_name)
+        return suggested_name
+    
+    def detect_project_boundaries(self, items: Union[Dict[str, DriveItem], AnalysisContext]) -> List[ProjectGroup]:
+        """Detect logical project groupings in the folder structure (prefer analyze_all)"""
+        # Same prompt as analyze_all, so after analyze_folder_structure the response cache answers it
+        return self.analyze_all(items)[1]
+    
+    def _cached(self, prompt: str) -> Optional[str]:
+        # With refresh set, cached replies are ignored but fresh ones are still stored
+        if self._cache and not self.refresh:
+            return self._cache.get(self.model, prompt)
+        return None
+    
+    def _chat(self, prompt: str) -> str:
+        if (cached := self._cached(prompt)) is not None:
+            return cached
         
-        try:
-            response = ollama.chat(model=self.model, messages=[
-                {'role': 'user', 'content': prompt}
-            ])
-            
-            content = response['message']['content']
-            json_start = content.find('{')
-            json_end = content.rfind('}') + 1
-            
-            if json_start != -1 and json_end != -1:
-                json_content = content[json_start:json_end]
-                data = json.loads(json_content)
-                
-                projects = []
-                for item in data.get('projects', []):
-                    projects.append(ProjectGroup(
-                        name=item['name'],
-                        folders=item.get('folders', []),
-                        files=item.get('files', []),
-                        rationale=item['rationale']
-                    ))
-                
-                return projects
-            
-        except Exception as e:
-            self.console.print(f"❌ Error detecting project boundaries: {e}")
-            return []
+        self._ensure_connection()
+        response = ollama.chat(model=self.model, messages=[
+            {'role': 'user', 'content': prompt}
+        ])
+        content = response['message']['content']
         
-        return []
+        if self._cache:
+            self._cache.set(self.model, prompt, content)
+        return content
     
-    def _prepare_structure_summary(self, items: Dict[str, DriveItem], max_items: int = 100) -> str:
-        """Prepare a concise summary of folder structure for LLM"""
-        folders = [item for item in items.values() if item.is_folder]
-        files = [item for item in items.values() if not item.is_folder]
+    def _chat_stream(self, prompt: str) -> Iterator[str]:
+        if (cached := self._cached(prompt)) is not None:
+            yield cached
+            return
         
-        # Sort by path depth to show structure
-        folders.sort(key=lambda x: (x.path.count('/'), x.path))
+        self._ensure_connection()
+        parts = []
+        for chunk in ollama.chat(model=self.model, messages=[
+            {'role': 'user', 'content': prompt}
+        ], stream=True):
+            parts.append(chunk['message']['content'])
+            yield parts[-1]
         
-        summary = []
-        summary.append(f"TOTAL: {len(folders)} folders, {len(files)} files\n")
+        # Only a reply that streamed to the end and holds complete JSON with some element is cached
+        content = "".join(parts)
+        if self._cache and _has_json_items(content):
+            self._cache.set(self.model, prompt, content)
+    
+    async def _achat(self, client: ollama.AsyncClient, prompt: str) -> str:
+        if (cached := self._cached(prompt)) is not None:
+            return cached
         
-        # Show folder hierarchy (limited)
-        summary.append("FOLDER STRUCTURE:")
-        for folder in folders[:max_items]:
-            depth = folder.path.count('/')
-            indent = "  " * depth
-            child_count = len([f for f in items.values() if f.parents and folder.id in f.parents])
-            summary.append(f"{indent}- {folder.name}/ ({child_count} items)")
+        self._ensure_connection()
+        response = await client.chat(model=self.model, messages=[
+            {'role': 'user', 'content': prompt}
+        ])
+        content = response['message']['content']
         
-        if len(folders) > max_items:
-            summary.append(f"... and {len(folders) - max_items} more folders")
+        if self._cache:
+            self._cache.set(self.model, prompt, content)
+        return content
+    
+    def _prepare_structure_summaries(self, items: Union[Dict[str, DriveItem], AnalysisContext], shard_size: int = 100,
+                                     max_shards: int = 8) -> List[str]:
+        """Prepare concise summaries of the folder structure for LLM, one per shard of folders"""
+        # Folders come sorted by path depth to show structure
+        context = AnalysisContext.of(items)
+        folders = context.folders
+        files = context.files
         
         # Show some file types
         file_extensions = {}
         for file in files:
-            ext = file.name.split('.')[-1].lower() if '.' in file.name else 'no-ext'
+            ext = file.name.rpartition('.')[2].lower() if '.' in file.name else 'no-ext'
             file_extensions[ext] = file_extensions.get(ext, 0) + 1
+        file_types = f"\nFILE TYPES: {dict(list(file_extensions.items())[:20])}"
         
-        summary.append(f"\nFILE TYPES: {dict(list(file_extensions.items())[:20])}")
+        shown = folders[:shard_size * max_shards]
+        shards = [shown[start:start + shard_size] for start in range(0, len(shown), shard_size)] or [[]]
         
-        return "\n".join(summary)
+        summaries = []
+        for i, shard in enumerate(shards, 1):
+            summary = []
+            summary.append(f"TOTAL: {len(folders)} folders, {len(files)} files\n")
+            
+            # Show folder hierarchy (limited)
+            summary.append("FOLDER STRUCTURE:" if len(shards) == 1 else f"FOLDER STRUCTURE (part {i} of {len(shards)}):")
+            for folder in shard:
+                indent = "  " * folder.depth
+                summary.append(f"{indent}- {folder.name}/ ({context.child_counts[folder.id]} items)")
+            
+            if i == len(shards) and len(folders) > len(shown):
+                summary.append(f"... and {len(folders) - len(shown)} more folders")
+            
+            summary.append(file_types)
+            summaries.append("\n".join(summary))
+        
+        return summaries
     
     def _prepare_content_summary(self, contents: List[DriveItem]) -> str:
         """Prepare a summary of folder contents"""
@@ -272,7 +513,7 @@ Format your response as JSON:
             # Show file types
             extensions = {}
             for file in files:
-                ext = file.name.split('.')[-1].lower() if '.' in file.name else 'no-ext'
+                ext = file.name.rpartition('.')[2].lower() if '.' in file.name else 'no-ext'
                 extensions[ext] = extensions.get(ext, 0) + 1
             
             summary.append(f"File types: {dict(list(extensions.items())[:10])}")
@@ -283,15 +524,13 @@ Format your response as JSON:
         
         return "\n".join(summary)
     
-    def print_smart_suggestions(self, suggestions: List[SmartSuggestion]):
-        """Print LLM suggestions in a nice format"""
-        if not suggestions:
-            self.console.print("🤔 No LLM suggestions generated")
-            return
-        
-        self.console.print("\n🧠 AI-Powered Reorganization Suggestions")
-        
+    def print_smart_suggestions(self, suggestions: Iterable[SmartSuggestion]):
+        """Print LLM suggestions in a nice format, each as soon as it arrives"""
+        i = 0
         for i, suggestion in enumerate(suggestions, 1):
+            if i == 1:
+                self.console.print("\n🧠 AI-Powered Reorganization Suggestions")
+            
             # Create confidence indicator
             confidence_color = "green" if suggestion.confidence > 0.8 else "yellow" if suggestion.confidence > 0.6 else "red"
             confidence_bar = "█" * int(suggestion.confidence * 10)
@@ -309,4 +548,7 @@ Format your response as JSON:
                 panel_content,
                 title=f"💡 {i}. {suggestion.title}",
                 border_style="blue"
-            ))
\ No newline at end of file
+            ))
+        
+        if not i:
+            self.console.print("🤔 No LLM suggestions generated")
\ No newline at end of file
@@ -1,12 +1,27 @@
-from typing import Dict, List, Tuple
+from typing import Dict, List, Tuple, Union
+from datetime import datetime, timedelta, timezone
 from dataclasses import dataclass
 from collections import defaultdict, Counter
 import re
-from rich.console import Console
 from rich.table import Table
 from rich.tree import Tree
 
-from ..scanner.drive_scanner import DriveItem
+from ..console import console
+from ..scanner.drive_scanner import AnalysisContext, DriveItem
+
+# Common naming issues, as one alternation so each name is searched once
+_NAMING_ISSUE_RE = re.compile(
+    r'(?P<mixed_case>[a-z]+[A-Z]+|[A-Z]+[a-z]+)'
+    r'|(?P<special_chars>[!@#$%^&*()+=\[\]{}|;:,.<>?])'
+    r'|(?P<multiple_spaces>\s{2,})'
+    r'|(?P<leading_trailing_space>^\s+|\s+$)'
+)
+
+# Extension -> file type group; other extensions are shown in upper case
+_EXT_GROUP = {ext: 'Documents' for ext in ('doc', 'docx', 'pdf', 'txt', 'rtf')}
+_EXT_GROUP.update({ext: 'Images' for ext in ('jpg', 'jpeg', 'png', 'gif', 'bmp', 'svg')})
+_EXT_GROUP.update({ext: 'Videos' for ext in ('mp4', 'avi', 'mov', 'mkv', 'flv')})
+_EXT_GROUP.update({ext: 'Audio' for ext in ('mp3', 'wav', 'flac', 'aac', 'm4a')})
 
 @dataclass
 class StructureIssue:
@@ -25,17 +40,18 @@ class ReorganizationSuggestion:
 
 class StructureAnalyzer:
     def __init__(self):
-        self.console = Console()
+        self.console = console
     
-    def analyze_structure(self, items: Dict[str, DriveItem]) -> Tuple[List[StructureIssue], List[ReorganizationSuggestion]]:
+    def analyze_structure(self, items: Union[Dict[str, DriveItem], AnalysisContext]) -> Tuple[List[StructureIssue], List[ReorganizationSuggestion]]:
         self.console.print("📊 Analyzing folder structure...")
         
         issues = []
         suggestions = []
         
-        # Get all folders and files
-        folders = [item for item in items.values() if item.is_folder]
-        files = [item for item in items.values() if not item.is_folder]
+        # Get all folders and files (partitioned once; pass the context on to reuse it)
+        context = AnalysisContext.of(items)
+        folders = context.folders
+        files = context.files
         
         # Analysis 1: Deep nesting
         deep_folders = self._find_deeply_nested_folders(folders)
@@ -49,7 +65,7 @@ class StructureAnalyzer:
             ))
         
         # Analysis 2: Empty folders
-        empty_folders = self._find_empty_folders(items, folders)
+        empty_folders = self._find_empty_folders(context)
         if empty_folders:
             issues.append(StructureIssue(
                 "Empty Folders",
@@ -81,7 +97,7 @@ class StructureAnalyzer:
             for file_type, scattered_files in scattered_types.items():
                 issues.append(StructureIssue(
                     "Scattered File Types",
-                    f"{file_type} files are scattered across {len(set(f.path.split('/')[0] for f in scattered_files))} different folders",
+                    f"{file_type} files are scattered across {len(set(f.path_parts[0] for f in scattered_files))} different folders",
                     scattered_files,
                     "medium",
                     f"Consider creating a dedicated folder for {file_type} files"
@@ -94,50 +110,23 @@ class StructureAnalyzer:
         return issues, suggestions
     
     def _find_deeply_nested_folders(self, folders: List[DriveItem]) -> List[DriveItem]:
-        return [folder for folder in folders if folder.path.count('/') > 5]
+        return [folder for folder in folders if folder.depth > 5]
     
-    def _find_empty_folders(self, all_items: Dict[str, DriveItem], folders: List[DriveItem]) -> List[DriveItem]:
-        empty = []
-        for folder in folders:
-            has_children = any(
-                item.parents and folder.id in item.parents 
-                for item in all_items.values()
-            )
-            if not has_children:
-                empty.append(folder)
-        return empty
+    def _find_empty_folders(self, context: AnalysisContext) -> List[DriveItem]:
+        return [folder for folder in context.folders if not context.child_counts[folder.id]]
     
     def _find_root_files(self, files: List[DriveItem]) -> List[DriveItem]:
-        return [file for file in files if '/' not in file.path]
+        return [file for file in files if file.depth == 0]
     
     def _analyze_naming_patterns(self, folders: List[DriveItem]) -> StructureIssue:
-        inconsistent_folders = []
-        
-        # Check for common naming issues
-        patterns = {
-            'mixed_case': re.compile(r'[a-z]+[A-Z]+|[A-Z]+[a-z]+'),
-            'special_chars': re.compile(r'[!@#$%^&*()+=\[\]{}|;:,.<>?]'),
-            'multiple_spaces': re.compile(r'\s{2,}'),
-            'leading_trailing_space': re.compile(r'^\s+|\s+$')
-        }
-        
-        issues_found = defaultdict(list)
+        # Each folder is listed once, however many patterns its name matches
+        inconsistent_folders = [folder for folder in folders if _NAMING_ISSUE_RE.search(folder.name)]
         
-        for folder in folders:
-            name = folder.name
-            for pattern_name, pattern in patterns.items():
-                if pattern.search(name):
-                    issues_found[pattern_name].append(folder)
-        
-        if issues_found:
-            all_inconsistent = []
-            for pattern_folders in issues_found.values():
-                all_inconsistent.extend(pattern_folders)
-            
+        if inconsistent_folders:
             return StructureIssue(
                 "Naming Inconsistencies",
                 f"Found folders with inconsistent naming patterns",
-                all_inconsistent,
+                inconsistent_folders,
                 "low",
                 "Standardize folder naming (e.g., use consistent case, avoid special characters)"
             )
@@ -145,45 +134,29 @@ class StructureAnalyzer:
         return None
     
     def _find_scattered_file_types(self, files: List[DriveItem]) -> Dict[str, List[DriveItem]]:
-        type_locations = defaultdict(lambda: defaultdict(list))
+        type_files = defaultdict(list)
+        type_folders = defaultdict(set)
         
-        # Group files by type and location
+        # Group files by type, noting which folders each type appears in
+        # (the parent's path parts identify the folder without joining them)
         for file in files:
             file_ext = self._get_file_extension(file.name)
-            folder_path = '/'.join(file.path.split('/')[:-1]) if '/' in file.path else 'root'
-            type_locations[file_ext][folder_path].append(file)
+            type_files[file_ext].append(file)
+            type_folders[file_ext].add(file.path_parts[:-1])
         
         # Find types that are scattered across multiple locations
-        scattered = {}
-        for file_type, locations in type_locations.items():
-            if len(locations) > 3 and sum(len(files) for files in locations.values()) > 5:
-                all_files = []
-                for files in locations.values():
-                    all_files.extend(files)
-                scattered[file_type] = all_files
-        
-        return scattered
+        return {
+            file_type: type_files[file_type]
+            for file_type, folders in type_folders.items()
+            if len(folders) > 3 and len(type_files[file_type]) > 5
+        }
     
     def _get_file_extension(self, filename: str) -> str:
-        if '.' in filename:
-            ext = filename.split('.')[-1].lower()
-            # Group similar extensions
-            doc_types = {'doc', 'docx', 'pdf', 'txt', 'rtf'}
-            image_types = {'jpg', 'jpeg', 'png', 'gif', 'bmp', 'svg'}
-            video_types = {'mp4', 'avi', 'mov', 'mkv', 'flv'}
-            audio_types = {'mp3', 'wav', 'flac', 'aac', 'm4a'}
-            
-            if ext in doc_types:
-                return 'Documents'
-            elif ext in image_types:
-                return 'Images'
-            elif ext in video_types:
-                return 'Videos'
-            elif ext in audio_types:
-                return 'Audio'
-            else:
-                return ext.upper()
-        return 'No Extension'
+        _, dot, ext = filename.rpartition('.')
+        if not dot:
+            return 'No Extension'
+        ext = ext.lower()
+        return _EXT_GROUP.get(ext, ext.upper())
     
     def _generate_suggestions(self, issues: List[StructureIssue], folders: List[DriveItem], files: List[DriveItem]) -> List[ReorganizationSuggestion]:
         suggestions = []
@@ -228,11 +201,12 @@ class StructureAnalyzer:
             ))
         
         # Suggestion 4: Archive old content
-        old_files = [f for f in files if self._is_old_file(f)]
-        if len(old_files) > 50:
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=365)).strftime('%Y-%m-%dT%H:%M:%S')
+        old_count = sum(1 for f in files if self._is_old_file(f, cutoff))
+        if old_count > 50:
             suggestions.append(ReorganizationSuggestion(
                 "Archive Old Content",
-                f"Archive {len(old_files)} files that haven't been modified in over a year",
+                f"Archive {old_count} files that haven't been modified in over a year",
                 [
                     "Create an 'Archive' folder in root",
                     "Move files older than 1 year to archive",
@@ -243,10 +217,10 @@ class StructureAnalyzer:
         
         return suggestions
     
-    def _is_old_file(self, file: DriveItem) -> bool:
-        # Simple heuristic - check if file is older than 1 year
-        # In a real implementation, you'd parse the date properly
-        return '2022' in file.modified_time or '2021' in file.modified_time
+    def _is_old_file(self, file: DriveItem, cutoff: str) -> bool:
+        # Drive timestamps are RFC 3339 in UTC ("2024-05-01T12:34:56.789Z"),
+        # so they order correctly as strings - no date parsing per file
+        return bool(file.modified_time) and file.modified_time < cutoff
     
     def print_analysis_report(self, issues: List[StructureIssue], suggestions: List[ReorganizationSuggestion]):
         self.console.print("\n📊 Structure Analysis Report")
@@ -281,29 +255,24 @@ class StructureAnalyzer:
                 self.console.print(f"   {suggestion.description}")
                 self.console.print(f"   [green]Expected improvement:[/] {suggestion.estimated_improvement}")
     
-    def visualize_structure(self, items: Dict[str, DriveItem], max_depth: int = 3):
+    def visualize_structure(self, items: Union[Dict[str, DriveItem], AnalysisContext], max_depth: int = 3):
         self.console.print("\n🌳 Folder Structure Visualization")
         
         # Build tree structure
         tree = Tree("📁 My Drive")
         folder_nodes = {"root": tree}
         
-        # Sort folders by depth to ensure parents are created first
-        folders = [item for item in items.values() if item.is_folder]
-        folders.sort(key=lambda x: x.path.count('/'))
+        # Folders come sorted by depth, so parents are created first
+        context = AnalysisContext.of(items)
         
-        for folder in folders:
-            if folder.path.count('/') > max_depth:
+        for folder in context.folders:
+            if folder.depth > max_depth:
                 continue
                 
-            parent_path = '/'.join(folder.path.split('/')[:-1]) if '/' in folder.path else 'root'
+            parent_path = '/'.join(folder.path_parts[:-1]) if folder.depth else 'root'
             parent_node = folder_nodes.get(parent_path, tree)
             
-            # Count children
-            children_count = sum(1 for item in items.values() 
-                               if item.parents and folder.id in item.parents)
-            
-            folder_node = parent_node.add(f"📁 {folder.name} ({children_count} items)")
+            folder_node = parent_node.add(f"📁 {folder.name} ({context.child_counts[folder.id]} items)")
             folder_nodes[folder.path] = folder_node
         
         self.console.print(tree)
\ No newline at end of file
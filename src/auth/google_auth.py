@@ -1,24 +1,56 @@
 import os
-import pickle
+import json
 from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
+from googleapiclient.model import JsonModel
+
+# Drive responses (listing pages above all) are decoded with orjson when it is installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+class _OrjsonModel(JsonModel):
+    """JsonModel that parses response bodies with orjson, straight from the raw bytes"""
+    
+    def deserialize(self, content):
+        try:
+            body = orjson.loads(content)
+        except orjson.JSONDecodeError:
+            # Non-JSON bodies are handled (and passed through) as the stock model does
+            return super().deserialize(content)
+        if self._data_wrapper and isinstance(body, dict) and 'data' in body:
+            body = body['data']
+        return body
 
 class GoogleDriveAuth:
     SCOPES = ['https://www.googleapis.com/auth/drive']
-    TOKEN_FILE = 'token.pickle'
+    TOKEN_FILE = 'token.json'
+    LEGACY_TOKEN_FILE = 'token.pickle'
     CREDENTIALS_FILE = 'credentials.json'
     
     def __init__(self):
-        self.service = None
-        self._authenticate()
+        self._service = None
+        self._credentials = None
+    
+    @property
+    def service(self):
+        # OAuth and the service build run on first use, not on construction
+        if self._service is None:
+            self._authenticate()
+        return self._service
+    
+    @property
+    def credentials(self):
+        """OAuth credentials behind the service, for clients that need their own HTTP connections"""
+        if self._credentials is None:
+            self._authenticate()
+        return self._credentials
     
     def _authenticate(self):
-        creds = None
-        
-        if os.path.exists(self.TOKEN_FILE):
-            with open(self.TOKEN_FILE, 'rb') as token:
-                creds = pickle.load(token)
+        creds = self._load_credentials()
         
         if not creds or not creds.valid:
             if creds and creds.expired and creds.refresh_token:
@@ -34,18 +66,41 @@ class GoogleDriveAuth:
                     self.CREDENTIALS_FILE, self.SCOPES)
                 creds = flow.run_local_server(port=0)
             
-            with open(self.TOKEN_FILE, 'wb') as token:
-                pickle.dump(creds, token)
+            self._save_credentials(creds)
+        
+        self._credentials = creds
+        # Built from the discovery document bundled with google-api-python-client,
+        # so startup never fetches it over HTTP (and there is nothing to cache)
+        self._service = build('drive', 'v3', credentials=creds, static_discovery=True, cache_discovery=False,
+                              model=_OrjsonModel() if orjson else None)
+    
+    def _load_credentials(self):
+        if os.path.exists(self.TOKEN_FILE):
+            with open(self.TOKEN_FILE) as token:
+                return Credentials.from_authorized_user_info(json.load(token), self.SCOPES)
         
-        self.service = build('drive', 'v3', credentials=creds)
+        if os.path.exists(self.LEGACY_TOKEN_FILE):
+            # One-time migration of the pickled token written by earlier versions
+            import pickle
+            with open(self.LEGACY_TOKEN_FILE, 'rb') as token:
+                creds = pickle.load(token)
+            self._save_credentials(creds)
+            os.remove(self.LEGACY_TOKEN_FILE)
+            return creds
+        
+        return None
+    
+    def _save_credentials(self, creds):
+        with open(self.TOKEN_FILE, 'w') as token:
+            token.write(creds.to_json())
     
     def get_service(self):
         return self.service
     
     def test_connection(self):
+        """Return the account's about info (user, storage quota), or None if the connection fails"""
         try:
-            results = self.service.files().list(pageSize=1).execute()
-            return True
+            return self.service.about().get(fields="user,storageQuota").execute()
         except Exception as e:
             print(f"Connection test failed: {e}")
-            return False
\ No newline at end of file
+            return None
\ No newline at end of file
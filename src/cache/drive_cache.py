@@ -1,120 +1,482 @@
+import hashlib
 import os
 import json
-import pickle
+import sqlite3
 import time
-from typing import Dict, Optional, List
-from dataclasses import asdict
+from collections import defaultdict
+from itertools import groupby
+from operator import itemgetter
+from collections.abc import ItemsView, Mapping, ValuesView
+from typing import Callable, Dict, Iterable, Iterator, Optional, List, Set, Tuple
 from pathlib import Path
-from rich.console import Console
 
-from ..scanner.drive_scanner import DriveItem
+from ..console import console
+from ..scanner.drive_scanner import DriveItem, build_item_paths
+from .sqlite_store import sqlite_store
+
+# orjson reads and writes metadata several times faster; stdlib json if the wheel is unavailable
+try:
+    from orjson import dumps as _dump_json, loads as _load_json
+except ImportError:
+    def _dump_json(obj) -> bytes:
+        return json.dumps(obj).encode()
+    _load_json = json.loads
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id TEXT PRIMARY KEY,
+    parent_id TEXT,
+    parents TEXT NOT NULL,
+    name TEXT NOT NULL,
+    mime_type TEXT NOT NULL,
+    size INTEGER,
+    md5 TEXT,
+    created_time TEXT,
+    modified_time TEXT,
+    path TEXT,
+    cached_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_items_parent ON items(parent_id);
+CREATE INDEX IF NOT EXISTS idx_items_size ON items(size);
+"""
+
+_ITEM_COLUMNS = "id, parents, name, mime_type, size, md5, created_time, modified_time, path, cached_at"
+
+# Columns in DriveItem field order, so loading is a positional constructor call per row
+_LOAD_COLUMNS = "id, name, mime_type, size, parents, created_time, modified_time, md5, path"
+
+# Bounds of the TTL adapted to churn, and how many scans its churn average covers
+_MIN_TTL_HOURS = 0.25
+_MAX_TTL_HOURS = 24
+_CHURN_HISTORY = 5
+# Churn per window at which the adaptive TTL equals the default TTL
+_DEFAULT_CHURN = 0.09
+# Saves closer together than this say too little about churn to count as a sample
+_MIN_CHURN_SAMPLE_HOURS = 0.1
+
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+
+# All descendants of a folder, following the first-parent links the scanner builds paths from
+_SUBTREE_CTE = """
+WITH RECURSIVE subtree(id) AS (
+    SELECT id FROM items WHERE parent_id = ?
+    UNION ALL
+    SELECT items.id FROM items JOIN subtree ON items.parent_id = subtree.id
+)
+"""
+
+def _content_hash(items: Dict[str, DriveItem]) -> str:
+    """Digest of every stored field of every item, independent of dict order"""
+    digest = hashlib.blake2b(digest_size=16)
+    for item_id in sorted(items):
+        item = items[item_id]
+        digest.update(f"{item_id}\0{','.join(item.parents)}\0{item.name}\0{item.mime_type}\0{item.size}\0"
+                      f"{item.md5_checksum}\0{item.created_time}\0{item.modified_time}\0{item.path}\n".encode())
+    return digest.hexdigest()
+
+def _item_from_row(row: Tuple) -> DriveItem:
+    """DriveItem from a row selected with _LOAD_COLUMNS"""
+    item_id, name, mime_type, size, parents, created_time, modified_time, md5, path = row
+    return DriveItem(item_id, name, mime_type, size, parents.split(',') if parents else [],
+                     created_time, modified_time, md5, path or "")
+
+def _insert_items(conn: sqlite3.Connection, items: Iterable[DriveItem], cached_at: float):
+    """Write items to the store (replacing existing rows), stamped with cached_at"""
+    conn.executemany(
+        f"INSERT OR REPLACE INTO items ({_ITEM_COLUMNS}, parent_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        ((item.id, ','.join(item.parents), item.name, item.mime_type, item.size, item.md5_checksum,
+          item.created_time, item.modified_time, item.path, cached_at, item.parents[0] if item.parents else None)
+         for item in items)
+    )
+
+def _anchor_ids(items: Dict[str, DriveItem]) -> Set[str]:
+    """Parents of top-level items: outside the cache, but still inside the scanned tree"""
+    return {item.parents[0] for item in items.values() if item.parents and item.parents[0] not in items}
+
+def _children_index(items: Dict[str, DriveItem]) -> Dict[str, List[str]]:
+    """Item IDs grouped by first parent, the links item paths are built from"""
+    children = defaultdict(list)
+    for item in items.values():
+        if item.parents:
+            children[item.parents[0]].append(item.id)
+    return children
+
+class _CachedValues(ValuesView):
+    def __iter__(self) -> Iterator[DriveItem]:
+        return map(_item_from_row, self._mapping._rows())
+
+class _CachedItemsView(ItemsView):
+    def __iter__(self) -> Iterator[Tuple[str, DriveItem]]:
+        return ((row[0], _item_from_row(row)) for row in self._mapping._rows())
+
+class CachedItems(Mapping):
+    """Read-only view of the cached items that reads rows from SQLite only as they are asked for"""
+    
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+    
+    def _rows(self) -> sqlite3.Cursor:
+        return self._conn.execute(f"SELECT {_LOAD_COLUMNS} FROM items")
+    
+    def __getitem__(self, item_id: str) -> DriveItem:
+        row = self._conn.execute(f"SELECT {_LOAD_COLUMNS} FROM items WHERE id = ?", (item_id,)).fetchone()
+        if row is None:
+            raise KeyError(item_id)
+        return _item_from_row(row)
+    
+    def __contains__(self, item_id) -> bool:
+        return self._conn.execute("SELECT 1 FROM items WHERE id = ?", (item_id,)).fetchone() is not None
+    
+    def __iter__(self) -> Iterator[str]:
+        return (row[0] for row in self._conn.execute("SELECT id FROM items"))
+    
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+    
+    # Whole-cache traversals stream rows in one query instead of a lookup per key
+    def values(self) -> ValuesView:
+        return _CachedValues(self)
+    
+    def items(self) -> ItemsView:
+        return _CachedItemsView(self)
+    
+    def children(self, folder_id: str) -> List[DriveItem]:
+        """Items whose first parent is folder_id, found through the parent index"""
+        return [_item_from_row(row) for row in
+                self._conn.execute(f"SELECT {_LOAD_COLUMNS} FROM items WHERE parent_id = ?", (folder_id,))]
 
 class DriveCache:
-    def __init__(self, cache_dir: str = ".drive_cache"):
+    def __init__(self, cache_dir: str = ".drive_cache", ttl_policy: Optional[Callable[[str], Optional[float]]] = None):
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(exist_ok=True)
-        self.console = Console()
+        self.console = console
         
         # Cache files
         self.metadata_file = self.cache_dir / "metadata.json"
-        self.items_file = self.cache_dir / "items.pkl"
+        self.items_file = self.cache_dir / "items.sqlite"
+        self.legacy_items_file = self.cache_dir / "items.pkl"
         
         # Default cache settings
-        self.default_ttl_hours = 2  # Cache expires after 2 hours
+        self.default_ttl_hours = 2  # Base TTL, adapted to churn when no TTL is given
+        # Optional per-entry TTL in hours by MIME type (None falls back to the cache TTL)
+        self.ttl_policy = ttl_policy
+        
+        self._store = sqlite_store(self.items_file, _SCHEMA)
+        # (mtime_ns, parsed metadata) of the last metadata.json read
+        self._metadata_cache: Optional[Tuple[int, Dict]] = None
+    
+    def _db(self) -> sqlite3.Connection:
+        """Open the item store on first use"""
+        return self._store.connect()
     
-    def save_scan_data(self, items: Dict[str, DriveItem], folder_id: str = 'root', ttl_hours: Optional[int] = None):
-        """Save scanned Drive data to cache"""
+    def close(self):
+        self._store.close()
+    
+    def save_scan_data(self, items: Dict[str, DriveItem], folder_id: str = 'root', ttl_hours: Optional[float] = None,
+                       changes_token: Optional[str] = None):
+        """Save scanned Drive data to cache (without a TTL, one adapted to the Drive's churn is used)"""
         try:
-            ttl = ttl_hours or self.default_ttl_hours
+            now = time.time()
+            
+            content_hash = _content_hash(items)
+            previous = self._read_metadata()
+            same_folder = previous is not None and previous.get('folder_id') == folder_id
+            unchanged = same_folder and previous.get('content_hash') == content_hash
+            
+            # Churn is measured against the stored scan, so it has to happen before it is replaced
+            conn = self._db()
+            churn_history = previous.get('churn_history', []) if same_folder else []
+            if same_folder:
+                churn = 0.0 if unchanged else self._measure_churn(conn, items)
+                hours = (now - previous.get('scan_time', now)) / 3600
+                if churn is not None and hours >= _MIN_CHURN_SAMPLE_HOURS:
+                    # Scaled to one default-TTL window by the real elapsed time, and weighted by the share
+                    # of a window it covers, so a quick rescan can't pass a few minutes as a quiet window
+                    window = self.default_ttl_hours
+                    churn_history = (churn_history + [[churn * window / hours, min(hours / window, 1.0)]])[-_CHURN_HISTORY:]
+            ttl = ttl_hours or self._adaptive_ttl_hours(churn_history)
+            
+            # Save items, replacing the previous scan in a single transaction
+            with conn:
+                if unchanged:
+                    # Same items as the stored scan: only renew their age instead of rewriting them
+                    conn.execute("UPDATE items SET cached_at = ?", (now,))
+                else:
+                    conn.execute("DELETE FROM items")
+                    _insert_items(conn, items.values(), now)
             
             # Save metadata
             metadata = {
                 'folder_id': folder_id,
-                'scan_time': time.time(),
+                'scan_time': now,
                 'ttl_seconds': ttl * 3600,
                 'item_count': len(items),
-                'expires_at': time.time() + (ttl * 3600)
+                'expires_at': now + (ttl * 3600),
+                'changes_token': changes_token,
+                'content_hash': content_hash,
+                'churn_history': churn_history
             }
             
-            with open(self.metadata_file, 'w') as f:
-                json.dump(metadata, f, indent=2)
+            self._write_metadata(metadata)
             
-            # Save items data (using pickle for complex objects)
-            with open(self.items_file, 'wb') as f:
-                pickle.dump(items, f)
+            # Pickled caches from older versions are superseded by the SQLite store
+            if self.legacy_items_file.exists():
+                self.legacy_items_file.unlink()
             
-            self.console.print(f"💾 Cached {len(items)} items (expires in {ttl}h)")
+            self.console.print(f"💾 Cached {len(items)} items (expires in {ttl:g}h)")
             
         except Exception as e:
             self.console.print(f"⚠️  Failed to save cache: {e}")
     
-    def load_scan_data(self, folder_id: str = 'root', ignore_expiry: bool = False) -> Optional[Dict[str, DriveItem]]:
-        """Load cached Drive data if available and valid"""
+    def _measure_churn(self, conn: sqlite3.Connection, items: Dict[str, DriveItem]) -> Optional[float]:
+        """Fraction of the stored items that were added, removed or modified since (None if empty)"""
+        stored = dict(conn.execute("SELECT id, modified_time FROM items"))
+        if not stored:
+            return None
+        
+        stored_count = len(stored)
+        changed = sum(1 for item_id, item in items.items() if stored.pop(item_id, None) != item.modified_time)
+        return (changed + len(stored)) / stored_count
+    
+    def _adaptive_ttl_hours(self, churn_history: List) -> float:
+        """TTL scaled inversely with recent churn: long for quiet drives, short for busy ones"""
+        if not churn_history:
+            return self.default_ttl_hours
+        
+        # No churn gives 10x the default TTL; 10% of items changing per window gives about the default.
+        # Samples are [churn per window, weight]; plain numbers are full-window samples from older caches.
+        samples = [sample if isinstance(sample, list) else [sample, 1.0] for sample in churn_history]
+        # Until the samples cover a full window together, the rest of it is assumed to churn at the
+        # rate of the default TTL, so one short sample can only nudge the TTL
+        covered = sum(weight for _, weight in samples)
+        if covered < 1.0:
+            samples.append([_DEFAULT_CHURN, 1.0 - covered])
+            covered = 1.0
+        churn = sum(rate * weight for rate, weight in samples) / covered
+        ttl = self.default_ttl_hours / (10 * churn + 0.1)
+        return round(min(max(ttl, _MIN_TTL_HOURS), _MAX_TTL_HOURS), 2)
+    
+    def _read_metadata(self) -> Optional[Dict]:
+        """Parsed metadata.json, re-read only when the file has changed since the last call"""
         try:
-            # Check if cache files exist
-            if not self.metadata_file.exists() or not self.items_file.exists():
+            mtime_ns = self.metadata_file.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+        
+        if self._metadata_cache is None or self._metadata_cache[0] != mtime_ns:
+            self._metadata_cache = (mtime_ns, _load_json(self.metadata_file.read_bytes()))
+        return self._metadata_cache[1]
+    
+    def _write_metadata(self, metadata: Dict):
+        # Written to a sibling file and renamed over the old one, so an interrupted
+        # write never leaves a torn metadata.json that makes the whole cache unreadable
+        tmp_file = self.metadata_file.with_suffix('.json.tmp')
+        tmp_file.write_bytes(_dump_json(metadata))
+        os.replace(tmp_file, self.metadata_file)
+        # Our own write is remembered directly, even if a coarse mtime wouldn't change
+        self._metadata_cache = (self.metadata_file.stat().st_mtime_ns, metadata)
+    
+    def load_scan_data(self, folder_id: str = 'root', ignore_expiry: bool = False, quiet: bool = False) -> Optional[Dict[str, DriveItem]]:
+        """Load cached Drive data for a folder, or for a subfolder of the cached one"""
+        try:
+            # Check if cache files exist, and load metadata
+            metadata = self._read_metadata()
+            if metadata is None or not self.items_file.exists():
                 return None
             
-            # Load metadata
-            with open(self.metadata_file, 'r') as f:
-                metadata = json.load(f)
-            
-            # Check if cache is for the same folder
-            if metadata.get('folder_id') != folder_id:
+            # Check per-entry expiry (unless ignored) - the oldest entry decides. Asked of
+            # SQLite first, so an expired cache never builds a single DriveItem.
+            rows = self._select_rows(metadata, folder_id, columns="MIN(cached_at)")
+            if rows is None:
                 return None
             
-            # Check expiry (unless ignored)
+            current_time = time.time()
+            oldest = rows.fetchone()[0] or metadata.get('scan_time', 0)
             if not ignore_expiry:
-                current_time = time.time()
-                expires_at = metadata.get('expires_at', 0)
-                
-                if current_time > expires_at:
-                    age_hours = (current_time - metadata.get('scan_time', 0)) / 3600
+                if self._is_expired(metadata, folder_id, oldest):
+                    age_hours = (current_time - oldest) / 3600
                     self.console.print(f"💨 Cache expired ({age_hours:.1f}h old)")
                     return None
             
-            # Load items
-            with open(self.items_file, 'rb') as f:
-                items = pickle.load(f)
+            # Rows are streamed from the cursor straight into DriveItems
+            items = {row[0]: _item_from_row(row)
+                     for row in self._select_rows(metadata, folder_id, columns=_LOAD_COLUMNS)}
             
-            age_minutes = (time.time() - metadata.get('scan_time', 0)) / 60
-            self.console.print(f"📋 Using cached data ({age_minutes:.0f} minutes old, {len(items)} items)")
+            # Stored paths are relative to the scanned folder; a subtree gets paths
+            # relative to its own folder, as a fresh scan of it would
+            if metadata.get('folder_id') != folder_id:
+                build_item_paths(items)
+            
+            if not quiet:
+                age_minutes = (current_time - oldest) / 60
+                self.console.print(f"📋 Using cached data ({age_minutes:.0f} minutes old, {len(items)} items)")
             return items
             
         except Exception as e:
             self.console.print(f"⚠️  Failed to load cache: {e}")
             return None
     
-    def is_cache_valid(self, folder_id: str = 'root') -> bool:
-        """Check if cache exists and is still valid"""
+    def _select_rows(self, metadata: Dict, folder_id: str, columns: str = _LOAD_COLUMNS,
+                     where: str = "1", order_by: str = "") -> Optional[sqlite3.Cursor]:
+        """Rows for folder_id: the whole store if it was the scanned folder, else its subtree"""
+        conn = self._db()
+        order = f" ORDER BY {order_by}" if order_by else ""
+        if metadata.get('folder_id') == folder_id:
+            return conn.execute(f"SELECT {columns} FROM items WHERE {where}{order}")
+        
+        # A folder inside the cached scan can be answered from its subtree
+        if conn.execute("SELECT 1 FROM items WHERE id = ? AND mime_type = ?",
+                        (folder_id, FOLDER_MIME_TYPE)).fetchone():
+            return conn.execute(f"{_SUBTREE_CTE} SELECT {columns} FROM items "
+                                f"WHERE id IN (SELECT id FROM subtree) AND {where}{order}", (folder_id,))
+        
+        return None
+    
+    def load_size_buckets(self, folder_id: str = 'root') -> Optional[Dict[int, List[DriveItem]]]:
+        """Cached files grouped by size, keeping only sizes shared by at least two files (None without a valid cache)"""
         try:
-            if not self.metadata_file.exists():
-                return False
+            metadata = self._read_metadata()
+            if metadata is None or not self.is_cache_valid(folder_id):
+                return None
             
-            with open(self.metadata_file, 'r') as f:
-                metadata = json.load(f)
+            # Rows arrive in size order through the size index, so each run of equal sizes is
+            # complete when the next size starts: only files with a colliding size are ever built
+            rows = self._select_rows(metadata, folder_id, where=f"size > 0 AND mime_type != '{FOLDER_MIME_TYPE}'",
+                                     order_by="size")
+            by_size = {}
+            for size, run in groupby(rows, key=itemgetter(3)):
+                group = list(run)
+                if len(group) > 1:
+                    by_size[size] = [_item_from_row(row) for row in group]
             
-            # Check folder match and expiry
+            # Stored paths are relative to the scanned folder; strip a subfolder's own path from them
             if metadata.get('folder_id') != folder_id:
+                prefix_len = len(self._db().execute("SELECT path FROM items WHERE id = ?",
+                                                    (folder_id,)).fetchone()[0]) + 1
+                for group in by_size.values():
+                    for item in group:
+                        item.set_path(item.path[prefix_len:])
+            
+            self.console.print(f"📋 Using cached data ({sum(len(g) for g in by_size.values())} files with a shared size)")
+            return by_size
+            
+        except Exception as e:
+            self.console.print(f"⚠️  Failed to load cache: {e}")
+            return None
+    
+    def _is_expired(self, metadata: Dict, folder_id: str, oldest: float) -> bool:
+        """Whether any entry for folder_id is past its TTL"""
+        if self.ttl_policy is None:
+            # One TTL for every entry, so the oldest entry decides
+            return time.time() - oldest > metadata.get('ttl_seconds', 0)
+        return bool(self.stale_folders(folder_id))
+    
+    def stale_folders(self, folder_id: str = 'root') -> Optional[Set[str]]:
+        """Folders to re-list so that every entry for folder_id is within its TTL; None if not cached"""
+        metadata = self._read_metadata()
+        if metadata is None or not self.items_file.exists():
+            return None
+        
+        rows = self._select_rows(metadata, folder_id, columns="id, parent_id, mime_type, cached_at")
+        if rows is None:
+            return None
+        
+        now = time.time()
+        default_ttl = metadata.get('ttl_seconds', 0)
+        ttl_by_type = {}
+        stale = set()
+        for item_id, parent_id, mime_type, cached_at in rows:
+            if mime_type not in ttl_by_type:
+                ttl_hours = self.ttl_policy(mime_type) if self.ttl_policy else None
+                ttl_by_type[mime_type] = default_ttl if ttl_hours is None else ttl_hours * 3600
+            
+            if now - cached_at > ttl_by_type[mime_type]:
+                # An entry is refreshed by listing its parent; a folder's own listing
+                # is also redone, so new contents of an empty folder are found too
+                stale.add(parent_id or metadata.get('folder_id'))
+                if mime_type == FOLDER_MIME_TYPE:
+                    stale.add(item_id)
+        return stale
+    
+    def update_entries(self, items: Dict[str, DriveItem], refreshed: Set[str], removed: Set[str],
+                       changed_paths: Set[str]):
+        """Write back a partial refresh: refreshed entries restart their TTL, the rest keep their age"""
+        try:
+            now = time.time()
+            conn = self._db()
+            with conn:
+                conn.executemany("DELETE FROM items WHERE id = ?", ((item_id,) for item_id in removed))
+                _insert_items(conn, (item for item in map(items.get, refreshed) if item is not None), now)
+                # A renamed or moved folder changes the paths of entries that were not re-listed
+                conn.executemany("UPDATE items SET path = ? WHERE id = ?",
+                                 ((items[item_id].path, item_id) for item_id in changed_paths - refreshed))
+                oldest = conn.execute("SELECT MIN(cached_at) FROM items").fetchone()[0] or now
+            
+            metadata = dict(self._read_metadata())
+            metadata.update({
+                'scan_time': oldest,
+                'item_count': len(items),
+                'expires_at': oldest + metadata.get('ttl_seconds', 0),
+                'content_hash': _content_hash(items)
+            })
+            self._write_metadata(metadata)
+            
+            self.console.print(f"💾 Refreshed {len(refreshed)} cached items, removed {len(removed)}")
+            
+        except Exception as e:
+            self.console.print(f"⚠️  Failed to save cache: {e}")
+    
+    def update_checksums(self, items: List[DriveItem]):
+        """Store checksums fetched after the scan, keeping each entry's age"""
+        if not self.items_file.exists():
+            return
+        try:
+            conn = self._db()
+            with conn:
+                conn.executemany("UPDATE items SET md5 = ? WHERE id = ?",
+                                 ((item.md5_checksum, item.id) for item in items))
+        except Exception as e:
+            self.console.print(f"⚠️  Failed to save checksums: {e}")
+    
+    def cached_items(self) -> Optional[CachedItems]:
+        """Lazy view of the cached scan, or None if there is no valid cache"""
+        metadata = self._read_metadata()
+        if metadata is None or not self.is_cache_valid(metadata.get('folder_id')):
+            return None
+        return CachedItems(self._db())
+    
+    def is_cache_valid(self, folder_id: str = 'root') -> bool:
+        """Check if cache exists and is still valid"""
+        try:
+            metadata = self._read_metadata()
+            if metadata is None or not self.items_file.exists():
                 return False
             
-            current_time = time.time()
-            expires_at = metadata.get('expires_at', 0)
+            # Check folder coverage and expiry of the oldest entry
+            rows = self._select_rows(metadata, folder_id, columns="MIN(cached_at)")
+            if rows is None:
+                return False
             
-            return current_time <= expires_at
+            oldest = rows.fetchone()[0] or metadata.get('scan_time', 0)
+            return not self._is_expired(metadata, folder_id, oldest)
             
         except Exception:
             return False
     
+    def get_changes_token(self) -> Optional[str]:
+        """Drive change-log cursor recorded with the cached scan"""
+        try:
+            return self._read_metadata().get('changes_token')
+        except Exception:
+            return None
+    
     def get_cache_info(self) -> Optional[Dict]:
         """Get information about current cache"""
         try:
-            if not self.metadata_file.exists():
+            metadata = self._read_metadata()
+            if metadata is None:
                 return None
             
-            with open(self.metadata_file, 'r') as f:
-                metadata = json.load(f)
-            
             current_time = time.time()
             scan_time = metadata.get('scan_time', 0)
             expires_at = metadata.get('expires_at', 0)
@@ -138,10 +500,10 @@ class DriveCache:
     def clear_cache(self):
         """Remove all cached data"""
         try:
-            if self.metadata_file.exists():
-                self.metadata_file.unlink()
-            if self.items_file.exists():
-                self.items_file.unlink()
+            self._store.delete()
+            for path in [self.metadata_file, self.legacy_items_file]:
+                if path.exists():
+                    path.unlink()
             
             self.console.print("🗑️  Cache cleared")
             return True
@@ -177,12 +539,18 @@ class DriveCache:
 class CachedDriveScanner:
     """Wrapper around DriveScanner with caching capabilities"""
     
-    def __init__(self, service, cache_ttl_hours: int = 2):
+    def __init__(self, session, cache_ttl_hours: Optional[float] = None, ttl_policy: Optional[Callable[[str], Optional[float]]] = None):
         self.scanner = None  # Will be imported dynamically to avoid circular imports
-        self.service = service
-        self.cache = DriveCache()
+        # Anything with service and credentials attributes (DriveSession, GoogleDriveAuth); read only
+        # when Drive is actually called, so a cache hit never authenticates
+        self.session = session
+        self.cache = DriveCache(ttl_policy=ttl_policy)
         self.cache_ttl_hours = cache_ttl_hours
     
+    @property
+    def service(self):
+        return self.session.service
+    
     def scan_drive(self, folder_id: str = 'root', force_refresh: bool = False, use_cache: bool = True) -> Dict[str, DriveItem]:
         """Scan drive with caching support"""
         
@@ -191,11 +559,16 @@ class CachedDriveScanner:
             cached_items = self.cache.load_scan_data(folder_id)
             if cached_items is not None:
                 return cached_items
-        
-        # Import here to avoid circular imports
-        if self.scanner is None:
-            from ..scanner.drive_scanner import DriveScanner
-            self.scanner = DriveScanner(self.service)
+            
+            # Expired cache: catch up through the Drive change log instead of rescanning
+            refreshed_items = self.refresh_from_changes(folder_id)
+            if refreshed_items is not None:
+                return refreshed_items
+            
+            # Without a usable change log, re-list only the folders holding expired entries
+            refreshed_items = self.refresh_stale_folders(folder_id)
+            if refreshed_items is not None:
+                return refreshed_items
         
         # Perform fresh scan
         if force_refresh:
@@ -203,14 +576,181 @@ class CachedDriveScanner:
         else:
             self.cache.console.print("📡 No valid cache found - scanning fresh data...")
         
-        items = self.scanner.scan_drive(folder_id)
+        # Take the change-log cursor before scanning so changes made during the scan are not lost
+        scanner = self._get_scanner()
+        changes_token = scanner.get_changes_token() if use_cache else None
+        items = scanner.scan_drive(folder_id)
         
         # Cache the results
         if use_cache:
-            self.cache.save_scan_data(items, folder_id, self.cache_ttl_hours)
+            self.cache.save_scan_data(items, folder_id, self.cache_ttl_hours, changes_token)
         
         return items
     
+    def refresh(self, folder_id: str = 'root', full: bool = False) -> Dict[str, DriveItem]:
+        """Bring the cache up to date, via the change log unless a full rescan is requested"""
+        if not full:
+            refreshed_items = self.refresh_from_changes(folder_id)
+            if refreshed_items is None:
+                refreshed_items = self.refresh_stale_folders(folder_id)
+            if refreshed_items is not None:
+                return refreshed_items
+        
+        return self.scan_drive(folder_id, force_refresh=True)
+    
+    def refresh_from_changes(self, folder_id: str = 'root') -> Optional[Dict[str, DriveItem]]:
+        """Apply Drive changes since the cached scan; None if the cache can't be refreshed this way"""
+        info = self.cache.get_cache_info()
+        changes_token = self.cache.get_changes_token()
+        if not info or not changes_token:
+            return None
+        
+        cached_folder_id = info['folder_id']
+        items = self.cache.load_scan_data(cached_folder_id, ignore_expiry=True, quiet=True)
+        if items is None:
+            return None
+        if folder_id != cached_folder_id and not (folder_id in items and items[folder_id].is_folder):
+            return None
+        
+        try:
+            changes, new_token = self._get_scanner().list_changes(changes_token)
+        except Exception as e:
+            self.cache.console.print(f"⚠️  Could not read Drive changes: {e}")
+            return None
+        
+        applied = self._apply_changes(items, changes)
+        build_item_paths(items)
+        self.cache.console.print(f"🔄 Applied {applied} changes since last scan")
+        self.cache.save_scan_data(items, cached_folder_id, self.cache_ttl_hours, new_token)
+        
+        if folder_id == cached_folder_id:
+            return items
+        return self.cache.load_scan_data(folder_id, quiet=True)
+    
+    def refresh_stale_folders(self, folder_id: str = 'root') -> Optional[Dict[str, DriveItem]]:
+        """Re-list the folders whose entries are past their TTL; None if the cache can't be refreshed this way"""
+        info = self.cache.get_cache_info()
+        if not info:
+            return None
+        
+        cached_folder_id = info['folder_id']
+        items = self.cache.load_scan_data(cached_folder_id, ignore_expiry=True, quiet=True)
+        stale = self.cache.stale_folders(cached_folder_id)
+        if items is None or stale is None:
+            return None
+        if folder_id != cached_folder_id and not (folder_id in items and items[folder_id].is_folder):
+            return None
+        
+        old_paths = {item_id: item.path for item_id, item in items.items()}
+        anchors = _anchor_ids(items)
+        children = _children_index(items)
+        
+        listings = {parent_id: listed for parent_id, listed in self._get_scanner().list_folders(list(stale)).items()
+                    if listed is not None}  # failed listings stay as cached and are retried next time
+        
+        # Removals first, while cached paths still locate the contents of removed folders
+        removed = set()
+        for parent_id, listed in listings.items():
+            listed_ids = {item.id for item in listed}
+            for child_id in children.get(parent_id, ()):
+                if child_id not in listed_ids and child_id in items:
+                    # Moved out of this folder or deleted
+                    removed.update(self._drop_item(items, child_id, children))
+        
+        refreshed = set()
+        new_folders = []
+        for parent_id, listed in listings.items():
+            if parent_id not in items and parent_id not in anchors:
+                continue  # inside a folder that was just removed
+            for item in listed:
+                if item.is_folder and item.id not in items:
+                    new_folders.append(item.id)
+                items[item.id] = item
+                refreshed.add(item.id)
+        
+        # Folders that appeared since the last scan are scanned in full
+        for new_folder_id in new_folders:
+            subtree = self._new_scanner().scan_drive(new_folder_id)
+            items.update(subtree)
+            refreshed.update(subtree)
+        
+        removed -= refreshed
+        build_item_paths(items)
+        changed_paths = {item_id for item_id, item in items.items() if old_paths.get(item_id) != item.path}
+        self.cache.console.print(f"🔄 Re-listed {len(stale)} folders with expired entries")
+        self.cache.update_entries(items, refreshed, removed, changed_paths)
+        
+        if folder_id == cached_folder_id:
+            return items
+        return self.cache.load_scan_data(folder_id, ignore_expiry=True, quiet=True)
+    
+    def _drop_item(self, items: Dict[str, DriveItem], item_id: str,
+                   children: Optional[Dict[str, List[str]]] = None) -> List[str]:
+        """Remove an item and, for a folder, its contents; returns the removed IDs"""
+        removed_item = items.pop(item_id)
+        removed = [item_id]
+        if not removed_item.is_folder:
+            return removed
+        
+        # Contents are found by following parent IDs - paths can't tell apart same-named siblings
+        if children is None:
+            children = _children_index(items)
+        pending = [item_id]
+        while pending:
+            for child_id in children.get(pending.pop(), ()):
+                if child_id in items:
+                    removed.append(child_id)
+                    if items.pop(child_id).is_folder:
+                        pending.append(child_id)
+        return removed
+    
+    def _apply_changes(self, items: Dict[str, DriveItem], changes: List[Dict]) -> int:
+        """Update items in place from a changes.list result, returning the number applied"""
+        anchors = _anchor_ids(items)
+        new_folders = []
+        applied = 0
+        
+        for change in changes:
+            file_id = change['fileId']
+            file = change.get('file')
+            removed = change.get('removed') or not file or file.get('trashed')
+            in_tree = not removed and any(p in items or p in anchors for p in file.get('parents', []))
+            
+            if in_tree:
+                item = DriveItem.from_api(file)
+                if item.is_folder and file_id not in items:
+                    new_folders.append(file_id)
+                items[file_id] = item
+            elif file_id in items:
+                # Deleted, trashed or moved out of the scanned tree - drop it with its contents
+                self._drop_item(items, file_id)
+            else:
+                continue
+            applied += 1
+        
+        # Folders moved in from elsewhere bring existing contents the change log doesn't list
+        for new_folder_id in new_folders:
+            items.update(self._new_scanner().scan_drive(new_folder_id))
+        
+        return applied
+    
+    def fetch_checksums(self, items: List[DriveItem]) -> int:
+        """Fetch md5 checksums missing from (older) cached items, and store them in the cache"""
+        found = self._get_scanner().fetch_checksums(items)
+        if found:
+            self.cache.update_checksums([item for item in items if item.md5_checksum])
+        return found
+    
+    def _get_scanner(self):
+        if self.scanner is None:
+            self.scanner = self._new_scanner()
+        return self.scanner
+    
+    def _new_scanner(self):
+        # Import here to avoid circular imports
+        from ..scanner.drive_scanner import DriveScanner
+        return DriveScanner(self.service, self.session.credentials)
+    
     def get_cache_status(self):
         """Get cache status"""
         return self.cache.get_cache_info()
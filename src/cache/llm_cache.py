@@ -0,0 +1,151 @@
+import hashlib
+import math
+import sqlite3
+import time
+from array import array
+from operator import itemgetter
+from typing import Dict, List, Optional, Tuple
+from pathlib import Path
+
+from ..console import console
+from .sqlite_store import sqlite_store
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    content TEXT NOT NULL,
+    cached_at REAL NOT NULL
+);
+"""
+
+class LLMResponseCache:
+    """Persistent exact-match cache of LLM replies, keyed by model and prompt"""
+    
+    def __init__(self, cache_dir: str = ".drive_cache", ttl_hours: float = 24 * 7):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(exist_ok=True)
+        self.cache_file = self.cache_dir / "llm.sqlite"
+        self.ttl_seconds = ttl_hours * 3600
+        
+        # Shares one connection to llm.sqlite with SemanticCache
+        self._store = sqlite_store(self.cache_file, _SCHEMA)
+    
+    def _db(self) -> sqlite3.Connection:
+        return self._store.connect()
+    
+    def close(self):
+        self._store.close()
+    
+    @staticmethod
+    def make_key(model: str, prompt: str) -> str:
+        # The model is part of the key, so switching models never serves another model's reply
+        return hashlib.blake2b(f"{model}\0{prompt}".encode()).hexdigest()
+    
+    def get(self, model: str, prompt: str) -> Optional[str]:
+        row = self._db().execute(
+            "SELECT content FROM responses WHERE key = ? AND cached_at > ?",
+            (self.make_key(model, prompt), time.time() - self.ttl_seconds)
+        ).fetchone()
+        return row[0] if row else None
+    
+    def set(self, model: str, prompt: str, content: str):
+        conn = self._db()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO responses (key, content, cached_at) VALUES (?, ?, ?)",
+                         (self.make_key(model, prompt), content, time.time()))
+    
+    def clear(self):
+        # Removes the whole database, semantic cache entries included
+        self._store.delete()
+
+_SEMANTIC_SCHEMA = """
+CREATE TABLE IF NOT EXISTS semantic_responses (
+    model TEXT NOT NULL,
+    embedding BLOB NOT NULL,
+    content TEXT NOT NULL,
+    cached_at REAL NOT NULL
+);
+"""
+
+class SemanticCache:
+    """Reuses an LLM reply for text whose embedding is close to text answered before"""
+    
+    def __init__(self, cache_dir: str = ".drive_cache", embed_model: str = "nomic-embed-text",
+                 threshold: float = 0.92, ttl_hours: float = 24 * 7):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(exist_ok=True)
+        self.cache_file = self.cache_dir / "llm.sqlite"
+        self.embed_model = embed_model
+        self.threshold = threshold
+        self.ttl_seconds = ttl_hours * 3600
+        self.console = console
+        
+        self._store = sqlite_store(self.cache_file, _SEMANTIC_SCHEMA)
+        # model -> [(unit embedding, reply)], loaded on first lookup for that model
+        self._entries: Dict[str, List[Tuple[array, str]]] = {}
+        self._last_embedding: Optional[Tuple[str, array]] = None
+        self._disabled = False
+    
+    def _db(self) -> sqlite3.Connection:
+        return self._store.connect()
+    
+    def close(self):
+        self._store.close()
+    
+    def _embed(self, text: str) -> Optional[array]:
+        if self._last_embedding and self._last_embedding[0] == text:
+            return self._last_embedding[1]
+        if self._disabled:
+            return None
+        
+        try:
+            import ollama
+            vector = ollama.embeddings(model=self.embed_model, prompt=text)['embedding']
+        except Exception as e:
+            # Without the embedding model the exact-match cache still works
+            self.console.print(f"⚠️  Semantic cache disabled ({self.embed_model}): {e}")
+            self.console.print(f"💡 Run: ollama pull {self.embed_model}")
+            self._disabled = True
+            return None
+        
+        # Stored normalized, so cosine similarity is a plain dot product
+        norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+        embedding = array('f', (x / norm for x in vector))
+        self._last_embedding = (text, embedding)
+        return embedding
+    
+    def _model_entries(self, model: str) -> List[Tuple[array, str]]:
+        if model not in self._entries:
+            rows = self._db().execute(
+                "SELECT embedding, content FROM semantic_responses WHERE model = ? AND cached_at > ?",
+                (model, time.time() - self.ttl_seconds)
+            )
+            entries = []
+            for blob, content in rows:
+                embedding = array('f')
+                embedding.frombytes(blob)
+                entries.append((embedding, content))
+            self._entries[model] = entries
+        return self._entries[model]
+    
+    def lookup(self, model: str, text: str) -> Optional[str]:
+        """Reply cached for the most similar text, if it clears the threshold"""
+        entries = self._model_entries(model)
+        if not entries or (embedding := self._embed(text)) is None:
+            return None
+        
+        best_score, best_content = max(
+            ((sum(a * b for a, b in zip(embedding, cached)), content) for cached, content in entries),
+            key=itemgetter(0)
+        )
+        return best_content if best_score >= self.threshold else None
+    
+    def add(self, model: str, text: str, content: str):
+        if (embedding := self._embed(text)) is None:
+            return
+        
+        conn = self._db()
+        with conn:
+            conn.execute("INSERT INTO semantic_responses (model, embedding, content, cached_at) VALUES (?, ?, ?, ?)",
+                         (model, embedding.tobytes(), content, time.time()))
+        self._model_entries(model).append((embedding, content))
@@ -0,0 +1,50 @@
+import sqlite3
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# One store per database file, so caches keeping their tables in the same file share a connection
+_stores: Dict[Path, 'SQLiteStore'] = {}
+
+def sqlite_store(path: Path, schema: str) -> 'SQLiteStore':
+    """The shared store for a database file, with schema created when it connects"""
+    key = Path(path).resolve()
+    store = _stores.get(key)
+    if store is None:
+        store = _stores[key] = SQLiteStore(key)
+    store.add_schema(schema)
+    return store
+
+class SQLiteStore:
+    """WAL-mode SQLite database opened on first use"""
+    
+    def __init__(self, path: Path):
+        self.path = path
+        self._schemas: List[str] = []
+        self._conn: Optional[sqlite3.Connection] = None
+    
+    def add_schema(self, schema: str):
+        if schema not in self._schemas:
+            self._schemas.append(schema)
+            if self._conn is not None:
+                self._conn.executescript(schema)
+    
+    def connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            for schema in self._schemas:
+                self._conn.executescript(schema)
+        return self._conn
+    
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+    
+    def delete(self):
+        """Close the database and remove it along with its WAL and shared-memory files"""
+        self.close()
+        for path in [self.path, Path(f"{self.path}-wal"), Path(f"{self.path}-shm")]:
+            if path.exists():
+                path.unlink()
@@ -0,0 +1,4 @@
+from rich.console import Console
+
+# One console for the whole CLI, so the terminal is probed once rather than per component
+console = Console()
@@ -1,12 +1,53 @@
+import random
 import time
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Union
+from collections import defaultdict
 from dataclasses import dataclass
-from rich.console import Console
 from rich.table import Table
 from rich.prompt import Confirm
-from rich.progress import Progress
+from rich.progress import Progress, TaskID
 
-from ..scanner.drive_scanner import DriveItem
+from ..console import console
+from ..scanner.drive_scanner import AnalysisContext, DriveItem
+
+# Category folders for organize-by-type, inverted once into an extension lookup
+_FILE_GROUPS = {
+    'Documents': ('.pdf', '.doc', '.docx', '.txt', '.rtf', '.odt'),
+    'Images': ('.jpg', '.jpeg', '.png', '.gif', '.bmp', '.svg', '.tiff'),
+    'Videos': ('.mp4', '.avi', '.mov', '.mkv', '.flv', '.wmv'),
+    'Audio': ('.mp3', '.wav', '.flac', '.aac', '.m4a', '.ogg'),
+    'Spreadsheets': ('.xls', '.xlsx', '.csv', '.ods'),
+    'Presentations': ('.ppt', '.pptx', '.odp'),
+    'Archives': ('.zip', '.rar', '.7z', '.tar', '.gz')
+}
+_EXT_CATEGORY = {ext: category for category, extensions in _FILE_GROUPS.items() for ext in extensions}
+
+# Errors Drive returns when requests come in faster than the per-user limits allow
+_RATE_LIMIT_REASONS = ('userRateLimitExceeded', 'rateLimitExceeded', 'RATE_LIMIT_EXCEEDED')
+
+def _is_rate_limited(exception: Exception) -> bool:
+    """Whether Drive throttled the request: HTTP 429, or 403 with a rate limit reason"""
+    try:
+        status = int(getattr(getattr(exception, 'resp', None), 'status', 0) or 0)
+    except (TypeError, ValueError):
+        return False
+    if status == 429:
+        return True
+    if status != 403:
+        return False
+    
+    details = getattr(exception, 'error_details', None)
+    if isinstance(details, list) and any(isinstance(detail, dict) and detail.get('reason') in _RATE_LIMIT_REASONS
+                                         for detail in details):
+        return True
+    # Without a structured errors list, the reason is only found in the response body
+    content = getattr(exception, 'content', None) or b''
+    if isinstance(content, bytes):
+        content = content.decode('utf-8', 'replace')
+    return any(reason in content for reason in _RATE_LIMIT_REASONS)
+
+# Characters that are replaced with '_' when fixing names
+_PROBLEMATIC_CHARS = str.maketrans(dict.fromkeys('<>:"|?*', '_'))
 
 @dataclass
 class ReorganizationAction:
@@ -17,11 +58,16 @@ class ReorganizationAction:
     description: str = ""
 
 class DriveOrganizer:
-    def __init__(self, service):
-        self.service = service
-        self.console = Console()
+    def __init__(self, session):
+        # Anything with a service attribute, read on first request - planning needs no Drive access
+        self.session = session
+        self.console = console
         self.actions_queue: List[ReorganizationAction] = []
     
+    @property
+    def service(self):
+        return self.session.service
+    
     def create_folder(self, name: str, parent_id: str = 'root') -> str:
         folder_metadata = {
             'name': name,
@@ -79,46 +125,13 @@ class DriveOrganizer:
     
     def organize_by_file_type(self, items: Dict[str, DriveItem], root_id: str = 'root', preview: bool = True) -> List[ReorganizationAction]:
         """Organize files by type into appropriate folders"""
-        actions = []
-        files = [item for item in items.values() if not item.is_folder]
-        
-        # Group files by type
-        file_groups = {
-            'Documents': ['.pdf', '.doc', '.docx', '.txt', '.rtf', '.odt'],
-            'Images': ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.svg', '.tiff'],
-            'Videos': ['.mp4', '.avi', '.mov', '.mkv', '.flv', '.wmv'],
-            'Audio': ['.mp3', '.wav', '.flac', '.aac', '.m4a', '.ogg'],
-            'Spreadsheets': ['.xls', '.xlsx', '.csv', '.ods'],
-            'Presentations': ['.ppt', '.pptx', '.odp'],
-            'Archives': ['.zip', '.rar', '.7z', '.tar', '.gz']
-        }
-        
-        type_folders = {}
+        # Group files by type first (all files, regardless of location)
+        by_type = defaultdict(list)
+        for item in items.values():
+            if not item.is_folder and (file_type := self._categorize_file(item.name)):
+                by_type[file_type].append(item)
         
-        for file in files:
-            file_ext = self._get_file_extension(file.name)
-            file_type = self._categorize_file(file.name, file_groups)
-            
-            if file_type:  # Process all files regardless of location
-                # Create folder if needed
-                if file_type not in type_folders:
-                    actions.append(ReorganizationAction(
-                        'create_folder',
-                        None,
-                        root_id,
-                        file_type,
-                        f"Create {file_type} folder"
-                    ))
-                    type_folders[file_type] = f"new_folder_{file_type}"
-                
-                # Move file
-                actions.append(ReorganizationAction(
-                    'move',
-                    file,
-                    type_folders[file_type],
-                    None,
-                    f"Move {file.name} to {file_type}"
-                ))
+        actions = self._group_actions(by_type, root_id)
         
         if preview:
             self._preview_actions(actions, "File Type Organization")
@@ -127,51 +140,46 @@ class DriveOrganizer:
     
     def organize_by_date(self, items: Dict[str, DriveItem], root_id: str = 'root', preview: bool = True) -> List[ReorganizationAction]:
         """Organize files by creation/modification date"""
-        actions = []
-        files = [item for item in items.values() if not item.is_folder]
+        # Group files by the year of their modified time (simplified)
+        by_year = defaultdict(list)
+        for item in items.values():
+            if not item.is_folder:
+                by_year[item.modified_time[:4] if item.modified_time else "Unknown"].append(item)
         
-        date_folders = {}
-        
-        for file in files:
-            # Extract year from modified time (simplified)
-            year = file.modified_time[:4] if file.modified_time else "Unknown"
-            
-            if year not in date_folders:
-                actions.append(ReorganizationAction(
-                    'create_folder',
-                    None,
-                    root_id,
-                    year,
-                    f"Create {year} folder"
-                ))
-                date_folders[year] = f"new_folder_{year}"
-            
-            actions.append(ReorganizationAction(
-                'move',
-                file,
-                date_folders[year],
-                None,
-                f"Move {file.name} to {year}"
-            ))
+        actions = self._group_actions(by_year, root_id)
         
         if preview:
             self._preview_actions(actions, "Date-based Organization")
         
         return actions
     
-    def clean_empty_folders(self, items: Dict[str, DriveItem], preview: bool = True) -> List[ReorganizationAction]:
+    def _group_actions(self, groups: Dict[str, List[DriveItem]], root_id: str) -> List[ReorganizationAction]:
+        """One create_folder action per group, followed by the moves of its files into it"""
+        actions = []
+        for group, files in groups.items():
+            actions.append(ReorganizationAction(
+                'create_folder',
+                None,
+                root_id,
+                group,
+                f"Create {group} folder"
+            ))
+            
+            target = f"new_folder_{group}"
+            actions.extend(
+                ReorganizationAction('move', file, target, None, f"Move {file.name} to {group}")
+                for file in files
+            )
+        return actions
+    
+    def clean_empty_folders(self, items: Union[Dict[str, DriveItem], AnalysisContext], preview: bool = True) -> List[ReorganizationAction]:
         """Remove empty folders"""
         actions = []
-        folders = [item for item in items.values() if item.is_folder]
+        # Children are counted under every parent in one pass over the items
+        context = AnalysisContext.of(items)
         
-        for folder in folders:
-            # Check if folder is empty
-            has_children = any(
-                item.parents and folder.id in item.parents
-                for item in items.values()
-            )
-            
-            if not has_children:
+        for folder in context.folders:
+            if not context.child_counts[folder.id]:
                 actions.append(ReorganizationAction(
                     'delete',
                     folder,
@@ -207,7 +215,7 @@ class DriveOrganizer:
         
         return actions
     
-    def execute_actions(self, actions: List[ReorganizationAction], confirm: bool = True) -> bool:
+    def execute_actions(self, actions: List[ReorganizationAction], confirm: bool = True, batch_size: int = 100) -> bool:
         """Execute a list of reorganization actions"""
         if not actions:
             self.console.print("No actions to execute.")
@@ -220,48 +228,118 @@ class DriveOrganizer:
         created_folders = {}
         success_count = 0
         
+        def on_result(request_id, response, exception):
+            nonlocal success_count
+            action = actions[int(request_id)]
+            if exception is not None:
+                self.console.print(f"❌ Failed: {action.description or action.action_type}: {exception}")
+                return
+            
+            success_count += 1
+            if action.action_type == 'create_folder':
+                created_folders[f"new_folder_{action.new_name}"] = response['id']
+                self.console.print(f"✅ Created folder: {action.new_name}")
+            elif action.action_type == 'move':
+                self.console.print(f"📁 Moved: {action.source_item.name}")
+            elif action.action_type == 'rename':
+                self.console.print(f"✏️ Renamed: {action.source_item.name}")
+            elif action.action_type == 'delete':
+                self.console.print(f"🗑️ Deleted: {action.source_item.name}")
+        
+        # Phase 1 creates every destination folder; phase 2 runs the rest against their real IDs
+        creates = [i for i, action in enumerate(actions) if action.action_type == 'create_folder']
+        others = [i for i, action in enumerate(actions) if action.action_type != 'create_folder']
+        
         with Progress() as progress:
             task = progress.add_task("Executing actions...", total=len(actions))
             
-            for action in actions:
-                success = False
+            self._execute_batched(actions, creates, on_result, progress, task, batch_size)
+            
+            # Resolve new-folder placeholders once, between the phases
+            pending_folders = {f"new_folder_{actions[i].new_name}" for i in creates}
+            runnable = []
+            for i in others:
+                action = actions[i]
+                if action.action_type == 'move' and action.target_location in pending_folders:
+                    if action.target_location not in created_folders:
+                        self.console.print(f"❌ Skipped: {action.description or action.action_type}: target folder was not created")
+                        progress.update(task, advance=1)
+                        continue
+                    action.target_location = created_folders[action.target_location]
+                runnable.append(i)
+            
+            self._execute_batched(actions, runnable, on_result, progress, task, batch_size)
+        
+        self.console.print(f"\n✅ Completed {success_count}/{len(actions)} actions successfully")
+        return success_count == len(actions)
+    
+    def _execute_batched(self, actions: List[ReorganizationAction], indices: List[int], on_result,
+                         progress: Progress, task: TaskID, batch_size: int, max_retries: int = 5):
+        """Send the given actions in batches of up to batch_size requests, one HTTP round-trip each"""
+        for start in range(0, len(indices), batch_size):
+            chunk = indices[start:start + batch_size]
+            pending = chunk
+            
+            for attempt in range(max_retries + 1):
+                throttled = []
+                
+                def on_batch_result(request_id, response, exception):
+                    if exception is not None and attempt < max_retries and _is_rate_limited(exception):
+                        throttled.append(int(request_id))
+                    else:
+                        on_result(request_id, response, exception)
+                
+                batch = self.service.new_batch_http_request(callback=on_batch_result)
+                for i in pending:
+                    try:
+                        request = self._action_request(actions[i])
+                        if request is not None:
+                            batch.add(request, request_id=str(i))
+                    except Exception as e:
+                        self.console.print(f"❌ Error executing action: {e}")
                 
                 try:
-                    if action.action_type == 'create_folder':
-                        folder_id = self.create_folder(action.new_name, action.target_location)
-                        if folder_id:
-                            created_folders[f"new_folder_{action.new_name}"] = folder_id
-                            success = True
-                    
-                    elif action.action_type == 'move':
-                        target_id = created_folders.get(action.target_location, action.target_location)
-                        current_parent = action.source_item.parents[0] if action.source_item.parents else None
-                        success = self.move_item(action.source_item.id, target_id, current_parent)
-                        if success:
-                            self.console.print(f"📁 Moved: {action.source_item.name}")
-                    
-                    elif action.action_type == 'rename':
-                        success = self.rename_item(action.source_item.id, action.new_name)
-                        if success:
-                            self.console.print(f"✏️ Renamed: {action.source_item.name}")
-                    
-                    elif action.action_type == 'delete':
-                        success = self.delete_item(action.source_item.id)
-                        if success:
-                            self.console.print(f"🗑️ Deleted: {action.source_item.name}")
-                    
-                    if success:
-                        success_count += 1
-                    
-                    time.sleep(0.1)  # Rate limiting
-                    
+                    batch.execute()
                 except Exception as e:
-                    self.console.print(f"❌ Error executing action: {e}")
+                    self.console.print(f"❌ Error executing batch: {e}")
                 
-                progress.update(task, advance=1)
+                if not throttled:
+                    break
+                
+                # Drive limits writes per user: resend only the throttled requests, backing off exponentially
+                delay = 2 ** attempt + random.random()
+                self.console.print(f"⏳ Rate limited, retrying {len(throttled)} actions in {delay:.1f}s...")
+                time.sleep(delay)
+                pending = throttled
+            
+            progress.update(task, advance=len(chunk))
+    
+    def _action_request(self, action: ReorganizationAction):
+        """The Drive API request carrying out an action (None for unknown action types)"""
+        if action.action_type == 'create_folder':
+            return self.service.files().create(body={
+                'name': action.new_name,
+                'mimeType': 'application/vnd.google-apps.folder',
+                'parents': [action.target_location]
+            })
         
-        self.console.print(f"\n✅ Completed {success_count}/{len(actions)} actions successfully")
-        return success_count == len(actions)
+        if action.action_type == 'move':
+            if action.source_item.parents:
+                # Remove from current parent and add to new parent
+                return self.service.files().update(
+                    fileId=action.source_item.id,
+                    addParents=action.target_location,
+                    removeParents=action.source_item.parents[0]
+                )
+            return self.service.files().update(fileId=action.source_item.id, addParents=action.target_location)
+        
+        if action.action_type == 'rename':
+            return self.service.files().update(fileId=action.source_item.id, body={'name': action.new_name})
+        
+        if action.action_type == 'delete':
+            return self.service.files().delete(fileId=action.source_item.id)
+        
+        return None
     
     def _preview_actions(self, actions: List[ReorganizationAction], title: str):
         """Preview actions before execution"""
@@ -299,26 +377,14 @@ class DriveOrganizer:
         self.console.print(f"Total actions: {len(actions)}")
     
     def _get_file_extension(self, filename: str) -> str:
-        return '.' + filename.split('.')[-1].lower() if '.' in filename else ''
+        _, dot, ext = filename.rpartition('.')
+        return '.' + ext.lower() if dot else ''
     
-    def _categorize_file(self, filename: str, file_groups: Dict[str, List[str]]) -> Optional[str]:
-        ext = self._get_file_extension(filename)
-        for category, extensions in file_groups.items():
-            if ext in extensions:
-                return category
-        return None
+    def _categorize_file(self, filename: str) -> Optional[str]:
+        return _EXT_CATEGORY.get(self._get_file_extension(filename))
     
     def _fix_name(self, name: str) -> str:
         """Fix common naming issues"""
-        # Remove duplicate spaces
-        fixed = ' '.join(name.split())
-        
-        # Remove leading/trailing spaces
-        fixed = fixed.strip()
-        
-        # Replace problematic characters
-        problematic = ['<', '>', ':', '"', '|', '?', '*']
-        for char in problematic:
-            fixed = fixed.replace(char, '_')
-        
-        return fixed
\ No newline at end of file
+        # Collapse whitespace runs (which also drops leading/trailing spaces),
+        # then replace problematic characters in a single pass
+        return ' '.join(name.split()).translate(_PROBLEMATIC_CHARS)
\ No newline at end of file
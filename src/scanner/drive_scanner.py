@@ -1,10 +1,18 @@
+import threading
 import time
-from typing import Dict, List, Optional
-from dataclasses import dataclass
-from rich.console import Console
+from collections import Counter, defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+from dataclasses import dataclass, field
+from operator import attrgetter
 from rich.progress import Progress, TaskID
 
-@dataclass
+from ..console import console
+
+# File fields requested from files.list and changes.list
+FILE_FIELDS = "id, name, mimeType, size, md5Checksum, parents, createdTime, modifiedTime"
+
+@dataclass(slots=True)
 class DriveItem:
     id: str
     name: str
@@ -13,100 +21,252 @@ class DriveItem:
     parents: List[str]
     created_time: str
     modified_time: str
+    md5_checksum: Optional[str] = None
     path: str = ""
     is_folder: bool = False
+    # Derived from path by set_path, so hot loops index instead of re-splitting
+    path_parts: Tuple[str, ...] = field(default=(), init=False, repr=False)
+    depth: int = field(default=0, init=False, repr=False)
     
     def __post_init__(self):
         self.is_folder = self.mime_type == 'application/vnd.google-apps.folder'
+        self.set_path(self.path)
+    
+    def set_path(self, path: str):
+        """Set the path together with its parts and depth"""
+        self.path = path
+        self.path_parts = tuple(path.split('/'))
+        self.depth = len(self.path_parts) - 1
+    
+    @property
+    def missing_checksum(self) -> bool:
+        """A downloadable file without an md5 checksum (Google Docs and other native files never have one)"""
+        return not self.md5_checksum and not self.mime_type.startswith('application/vnd.google-apps.')
+    
+    @classmethod
+    def from_api(cls, item: Dict) -> 'DriveItem':
+        """Build a DriveItem from a Drive API file resource"""
+        size = item.get('size')
+        # Positional in field order, as this runs once per listed file
+        return cls(item['id'], item['name'], item['mimeType'], int(size) if size else None, item.get('parents', []),
+                   item['createdTime'], item['modifiedTime'], item.get('md5Checksum'))
+
+def build_item_paths(items: Dict[str, DriveItem]):
+    """Set each item's path from its chain of first parents, resolving every ancestor once"""
+    # A parent outside the scanned items (the Drive root or the scanned folder) is the top level.
+    # None marks an item whose chain is still being walked, so a cycle is detected when met again.
+    paths: Dict[str, Optional[str]] = {}
+    
+    for item_id in items:
+        chain = []
+        current = item_id
+        while current not in paths and (item := items.get(current)) is not None:
+            paths[current] = None
+            chain.append(item)
+            current = item.parents[0] if item.parents else None
+        
+        if current in paths:
+            path = paths[current] if paths[current] is not None else "[CIRCULAR]"
+        else:
+            path = ""
+        
+        for item in reversed(chain):
+            path = f"{path}/{item.name}" if path else item.name
+            paths[item.id] = path
+    
+    for item_id, item in items.items():
+        item.set_path(paths[item_id])
+
+@dataclass
+class AnalysisContext:
+    """Scan result split once into folders and files, shared by the analysis passes"""
+    items: Dict[str, DriveItem]
+    folders: List[DriveItem]  # sorted by depth, then path
+    files: List[DriveItem]
+    child_counts: Counter
+    
+    @classmethod
+    def of(cls, items: Union[Dict[str, DriveItem], 'AnalysisContext']) -> 'AnalysisContext':
+        """Partition items in a single pass (an existing context is returned as is)"""
+        if isinstance(items, AnalysisContext):
+            return items
+        
+        folders, files = [], []
+        child_counts = Counter()
+        for item in items.values():
+            (folders if item.is_folder else files).append(item)
+            child_counts.update(item.parents or ())
+        
+        folders.sort(key=attrgetter('depth', 'path'))
+        return cls(items, folders, files, child_counts)
 
 class DriveScanner:
-    def __init__(self, service):
+    def __init__(self, service, credentials, max_workers: int = 8):
         self.service = service
-        self.console = Console()
+        # Listing workers build their own authorized clients from these
+        self.credentials = credentials
+        self.max_workers = max_workers
+        self._local = threading.local()
+        self.console = console
         self.items: Dict[str, DriveItem] = {}
         self.folder_structure: Dict[str, List[str]] = {}
+        # (lowercased name, item) pairs for case-insensitive search, built on the first search after a scan
+        self._names_lower: Optional[List[Tuple[str, DriveItem]]] = None
     
     def scan_drive(self, root_folder_id: str = 'root') -> Dict[str, DriveItem]:
         self.console.print("🔍 Starting Google Drive scan...")
         
         with Progress() as progress:
             task = progress.add_task("Scanning files...", total=None)
-            self._scan_recursive(root_folder_id, "", progress, task)
+            for _, drive_item in self._scan_recursive(root_folder_id, "", progress, task):
+                self.items[drive_item.id] = drive_item
         
+        self._build_folder_structure()
         self._build_paths()
+        self._names_lower = None
         self.console.print(f"✅ Scan complete! Found {len(self.items)} items")
         return self.items
     
-    def _scan_recursive(self, folder_id: str, current_path: str, progress: Progress, task: TaskID):
-        page_token = None
+    def _scan_recursive(self, folder_id: str, current_path: str, progress: Progress, task: TaskID) -> Iterator[Tuple[str, DriveItem]]:
+        """Yield (listing folder ID, item) pairs, each folder before its contents"""
+        # Listing pages are fetched concurrently by a worker pool; results are yielded here on the
+        # calling thread, so consumers need no locking
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        pending = {executor.submit(self._list_page, folder_id): (folder_id, current_path)}
         
-        while True:
-            try:
-                results = self.service.files().list(
-                    q=f"'{folder_id}' in parents and trashed=false",
-                    fields="nextPageToken, files(id, name, mimeType, size, parents, createdTime, modifiedTime)",
-                    pageSize=1000,
-                    pageToken=page_token
-                ).execute()
-                
-                items = results.get('files', [])
-                
-                for item in items:
-                    drive_item = DriveItem(
-                        id=item['id'],
-                        name=item['name'],
-                        mime_type=item['mimeType'],
-                        size=int(item.get('size', 0)) if item.get('size') else None,
-                        parents=item.get('parents', []),
-                        created_time=item['createdTime'],
-                        modified_time=item['modifiedTime']
-                    )
-                    
-                    self.items[item['id']] = drive_item
+        try:
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    parent_id, parent_path = pending.pop(future)
+                    try:
+                        results = future.result()
+                    except Exception as e:
+                        self.console.print(f"❌ Error scanning folder {parent_id}: {e}")
+                        continue
                     
-                    if drive_item.is_folder:
-                        self.folder_structure[item['id']] = []
-                        folder_path = f"{current_path}/{item['name']}" if current_path else item['name']
-                        progress.update(task, description=f"Scanning: {folder_path}")
-                        self._scan_recursive(item['id'], folder_path, progress, task)
+                    # The next page is requested before this one is processed, so its
+                    # round-trip overlaps with handling these items
+                    if results.get('nextPageToken'):
+                        next_page = executor.submit(self._list_page, parent_id, results['nextPageToken'])
+                        pending[next_page] = (parent_id, parent_path)
                     
-                    if folder_id in self.folder_structure:
-                        self.folder_structure[folder_id].append(item['id'])
+                    for item in results.get('files', []):
+                        drive_item = DriveItem.from_api(item)
+                        yield parent_id, drive_item
+                        
+                        if drive_item.is_folder:
+                            folder_path = f"{parent_path}/{drive_item.name}" if parent_path else drive_item.name
+                            progress.update(task, description=f"Scanning: {folder_path}")
+                            pending[executor.submit(self._list_page, drive_item.id)] = (drive_item.id, folder_path)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+    
+    def list_folders(self, folder_ids: List[str]) -> Dict[str, Optional[List[DriveItem]]]:
+        """Direct children of each folder, listed concurrently (None where a listing failed)"""
+        listings = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for folder_id, (items, error) in zip(folder_ids, executor.map(self._list_folder, folder_ids)):
+                if error is not None:
+                    self.console.print(f"❌ Error scanning folder {folder_id}: {error}")
+                    listings[folder_id] = None
+                else:
+                    listings[folder_id] = [DriveItem.from_api(item) for item in items]
+        return listings
+    
+    def _list_folder(self, folder_id: str) -> Tuple[List[Dict], Optional[Exception]]:
+        """All pages of one folder's listing, plus the error that cut it short (if any)"""
+        items = []
+        page_token = None
+        
+        try:
+            while True:
+                results = self._list_page(folder_id, page_token)
+                items.extend(results.get('files', []))
                 
                 page_token = results.get('nextPageToken')
                 if not page_token:
-                    break
-                    
-            except Exception as e:
-                self.console.print(f"❌ Error scanning folder {folder_id}: {e}")
-                break
+                    return items, None
+        except Exception as e:
+            return items, e
+    
+    def _list_page(self, folder_id: str, page_token: Optional[str] = None) -> Dict:
+        """One page of a folder's listing"""
+        return self.service.files().list(
+            q=f"'{folder_id}' in parents and trashed=false",
+            fields=f"nextPageToken, files({FILE_FIELDS})",
+            pageSize=1000,
+            pageToken=page_token
+        ).execute(http=self._thread_http())
+    
+    def _thread_http(self):
+        # httplib2 connections are not thread-safe, so each worker gets its own authorized client
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            from google_auth_httplib2 import AuthorizedHttp
+            from googleapiclient.http import build_http
+            # build_http applies the client library's default socket timeout
+            http = self._local.http = AuthorizedHttp(self.credentials, http=build_http())
+        return http
+    
+    def _build_folder_structure(self):
+        # Grouped in one pass after the scan rather than branching per item while listing
+        folder_structure = defaultdict(list)
+        for item in self.items.values():
+            if item.parents:
+                folder_structure[item.parents[0]].append(item.id)
+        self.folder_structure = folder_structure
     
     def _build_paths(self):
-        def get_path(item_id: str, visited: set = None) -> str:
-            if visited is None:
-                visited = set()
-            
-            if item_id in visited:
-                return "[CIRCULAR]"
-            
-            if item_id == 'root':
-                return ""
+        build_item_paths(self.items)
+    
+    def get_changes_token(self) -> Optional[str]:
+        """Cursor marking 'now' in the Drive change log"""
+        try:
+            return self.service.changes().getStartPageToken().execute().get('startPageToken')
+        except Exception as e:
+            self.console.print(f"⚠️  Could not get change token: {e}")
+            return None
+    
+    def list_changes(self, page_token: str) -> Tuple[List[Dict], str]:
+        """All changes since page_token, plus the token to resume from next time"""
+        changes = []
+        while True:
+            results = self.service.changes().list(
+                pageToken=page_token,
+                fields=f"nextPageToken, newStartPageToken, changes(fileId, removed, file({FILE_FIELDS}, trashed))",
+                pageSize=1000
+            ).execute()
             
-            item = self.items.get(item_id)
-            if not item or not item.parents:
-                return item.name if item else "[UNKNOWN]"
+            changes.extend(results.get('changes', []))
             
-            visited.add(item_id)
-            parent_path = get_path(item.parents[0], visited)
-            visited.remove(item_id)
+            if 'newStartPageToken' in results:
+                return changes, results['newStartPageToken']
+            page_token = results['nextPageToken']
+    
+    def fetch_checksums(self, items: List[DriveItem], batch_size: int = 100) -> int:
+        """Fill in missing md5 checksums using batched files.get requests"""
+        pending = {item.id: item for item in items}
+        found = 0
+        
+        def on_result(request_id, response, exception):
+            nonlocal found
+            if exception is None and response.get('md5Checksum'):
+                pending[request_id].md5_checksum = response['md5Checksum']
+                found += 1
+        
+        item_ids = list(pending)
+        for start in range(0, len(item_ids), batch_size):
+            batch = self.service.new_batch_http_request(callback=on_result)
+            for item_id in item_ids[start:start + batch_size]:
+                batch.add(self.service.files().get(fileId=item_id, fields='md5Checksum'), request_id=item_id)
             
-            if parent_path:
-                return f"{parent_path}/{item.name}"
-            else:
-                return item.name
+            try:
+                batch.execute()
+            except Exception as e:
+                self.console.print(f"❌ Error fetching checksums: {e}")
         
-        for item_id, item in self.items.items():
-            item.path = get_path(item_id)
+        return found
     
     def get_folder_items(self, folder_id: str) -> List[DriveItem]:
         return [self.items[item_id] for item_id in self.folder_structure.get(folder_id, [])]
@@ -121,8 +281,10 @@ class DriveScanner:
         if case_sensitive:
             return [item for item in self.items.values() if name in item.name]
         else:
+            if self._names_lower is None:
+                self._names_lower = [(item.name.lower(), item) for item in self.items.values()]
             name_lower = name.lower()
-            return [item for item in self.items.values() if name_lower in item.name.lower()]
+            return [item for item_name, item in self._names_lower if name_lower in item_name]
     
     def get_folder_depth(self, item_id: str) -> int:
-        return item.path.count('/') if (item := self.items.get(item_id)) else 0
\ No newline at end of file
+        return item.depth if (item := self.items.get(item_id)) else 0
\ No newline at end of file
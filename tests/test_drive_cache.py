@@ -0,0 +1,60 @@
+import tempfile
+import unittest
+
+from src.cache.drive_cache import DriveCache, FOLDER_MIME_TYPE
+from src.scanner.drive_scanner import DriveItem, build_item_paths
+
+def _item(item_id: str, parent_id: str, size=None, mime_type='application/pdf') -> DriveItem:
+    return DriveItem(item_id, item_id, mime_type, size, [parent_id], '', '')
+
+class LoadSizeBucketsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = DriveCache(self.tmp.name)
+        items = {item.id: item for item in [
+            _item('docs', 'root', mime_type=FOLDER_MIME_TYPE),
+            _item('a', 'docs', 100), _item('b', 'docs', 100), _item('c', 'docs', 200),
+            _item('d', 'root', 100), _item('e', 'root', 300), _item('f', 'root', 300),
+        ]}
+        build_item_paths(items)
+        self.cache.save_scan_data(items, 'root', ttl_hours=2)
+    
+    def tearDown(self):
+        self.cache.close()
+        self.tmp.cleanup()
+    
+    def test_only_shared_sizes_are_returned(self):
+        by_size = self.cache.load_size_buckets('root')
+        self.assertEqual({size: sorted(f.id for f in group) for size, group in by_size.items()},
+                         {100: ['a', 'b', 'd'], 300: ['e', 'f']})
+    
+    def test_subfolder_paths_are_relative_to_it(self):
+        by_size = self.cache.load_size_buckets('docs')
+        self.assertEqual({size: sorted(f.path for f in group) for size, group in by_size.items()},
+                         {100: ['a', 'b']})
+    
+    def test_expired_cache_returns_none(self):
+        self.cache.save_scan_data(self.cache.load_scan_data('root'), 'root', ttl_hours=-1)
+        self.assertIsNone(self.cache.load_size_buckets('root'))
+
+class AdaptiveTTLTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = DriveCache(self.tmp.name)
+    
+    def tearDown(self):
+        self.cache.close()
+        self.tmp.cleanup()
+    
+    def test_quick_unchanged_rescan_keeps_default_ttl(self):
+        items = {'a': _item('a', 'root', 100)}
+        self.cache.save_scan_data(items, 'root')
+        self.cache.save_scan_data(items, 'root')
+        self.assertEqual(self.cache._read_metadata()['ttl_seconds'], self.cache.default_ttl_hours * 3600)
+    
+    def test_short_quiet_sample_only_nudges_ttl(self):
+        self.assertLess(self.cache._adaptive_ttl_hours([[0.0, 0.1]]), 2 * self.cache.default_ttl_hours)
+        self.assertEqual(self.cache._adaptive_ttl_hours([[0.0, 1.0]]), 10 * self.cache.default_ttl_hours)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import types
+import unittest
+
+from src.reorganizer.drive_organizer import _is_rate_limited
+
+class _HttpError(Exception):
+    """Stand-in for googleapiclient's HttpError: a response status, parsed error details and the raw body"""
+    
+    def __init__(self, status, error_details=None, content=b''):
+        super().__init__(status)
+        self.resp = types.SimpleNamespace(status=status)
+        self.error_details = error_details
+        self.content = content
+
+class IsRateLimitedTest(unittest.TestCase):
+    def test_plain_429(self):
+        self.assertTrue(_is_rate_limited(_HttpError(429)))
+    
+    def test_403_with_user_rate_limit_reason(self):
+        error = _HttpError(403, [{'domain': 'usageLimits', 'reason': 'userRateLimitExceeded'}])
+        self.assertTrue(_is_rate_limited(error))
+    
+    def test_403_with_rate_limit_reason(self):
+        self.assertTrue(_is_rate_limited(_HttpError(403, [{'reason': 'rateLimitExceeded'}])))
+    
+    def test_403_with_reason_only_in_body(self):
+        body = b'{"error": {"code": 403, "message": "Rate limit", "reason": "userRateLimitExceeded"}}'
+        self.assertTrue(_is_rate_limited(_HttpError(403, error_details='', content=body)))
+    
+    def test_other_403_is_not_retried(self):
+        error = _HttpError(403, [{'reason': 'insufficientFilePermissions'}], b'{"error": {"code": 403}}')
+        self.assertFalse(_is_rate_limited(error))
+    
+    def test_other_errors_are_not_retried(self):
+        self.assertFalse(_is_rate_limited(_HttpError(500)))
+        self.assertFalse(_is_rate_limited(ValueError("no response")))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,26 @@
+import unittest
+
+from src.analyzer.duplicate_detector import DuplicateDetector
+from src.scanner.drive_scanner import DriveItem
+
+def _file(item_id: str, name: str, size: int, md5=None) -> DriveItem:
+    return DriveItem(item_id, name, 'application/pdf', size, ['root'], '', '', md5)
+
+class FindDuplicatesTest(unittest.TestCase):
+    def test_differing_checksums_are_not_grouped_by_name(self):
+        items = [_file('a', 'report.pdf', 2048, 'aaa'), _file('b', 'report.pdf', 2048, 'bbb')]
+        self.assertEqual(DuplicateDetector().find_duplicates(items), [])
+    
+    def test_matching_checksums_are_grouped_by_content(self):
+        items = [_file('a', 'report.pdf', 2048, 'aaa'), _file('b', 'report (1).pdf', 2048, 'aaa')]
+        groups = DuplicateDetector().find_duplicates(items)
+        self.assertEqual([(g.detection_method, [f.id for f in g.files]) for g in groups],
+                         [("Content Hash", ['a', 'b'])])
+    
+    def test_files_without_checksums_are_grouped_by_name(self):
+        items = [_file('a', 'report.pdf', 2048), _file('b', 'report.pdf', 2048)]
+        groups = DuplicateDetector().find_duplicates(items)
+        self.assertEqual([(g.detection_method, g.confidence) for g in groups], [("Name + Size", 0.9)])
+
+if __name__ == '__main__':
+    unittest.main()